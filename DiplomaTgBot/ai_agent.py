@@ -1,24 +1,22 @@
 # ai_agent.py
-import html as html_lib
-import re
 from typing import Dict, List
 
-TAG_RE = re.compile(r"<[^>]+>")
+from normalizer import clean_text
 
 
 def _clean(s: str) -> str:
-    if not s:
-        return ""
-    s = TAG_RE.sub("", s)
-    s = html_lib.unescape(s)
-    s = s.replace("\xa0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+    return clean_text(s)
 
 
 def summarize_news_item(item: Dict, keywords: List[str]) -> str:
-    title = _clean(item.get("title", ""))
-    summary = _clean(item.get("summary", ""))
+    # Записи з news_fetcher / articles уже нормалізовані (є search_text) —
+    # повторно не чистимо
+    if "search_text" in item:
+        title = item.get("title", "")
+        summary = item.get("summary", "")
+    else:
+        title = _clean(item.get("title", ""))
+        summary = _clean(item.get("summary", ""))
     link = item.get("link", "")
     topic = item.get("topic", "")
 
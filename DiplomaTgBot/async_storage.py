@@ -0,0 +1,121 @@
+# async_storage.py
+
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from storage import Storage, UserProfile, storage
+from config import DB_ASYNC_WORKERS
+
+T = TypeVar("T")
+
+
+class AsyncStorage:
+    """
+    Async-обгортка над Storage для FastAPI: кожен виклик виконується на
+    окремих потоках БД (власний executor, не спільний threadpool Starlette),
+    а корутина лише чекає результат. Тисячі одночасних запитів не
+    збільшують кількість потоків — вони стоять у черзі executor-а.
+    Методи й семантика ті самі, що у Storage (разом з кешами профілів і sent_news).
+    """
+
+    def __init__(self, sync: Storage, workers: int = 4) -> None:
+        self.sync = sync
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="db")
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Довільна синхронна робота з БД на потоках БД (кілька викликів Storage разом)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    # ---------- users / profile ----------
+    async def add_user_if_not_exists(self, chat_id: int) -> None:
+        await self.run(self.sync.add_user_if_not_exists, chat_id)
+
+    async def get_profile(self, chat_id: int) -> UserProfile:
+        return await self.run(self.sync.get_profile, chat_id)
+
+    async def get_keywords(self, chat_id: int) -> List[str]:
+        return await self.run(self.sync.get_keywords, chat_id)
+
+    async def set_keywords(self, chat_id: int, keywords: List[str]) -> None:
+        await self.run(self.sync.set_keywords, chat_id, keywords)
+
+    async def clear_keywords(self, chat_id: int) -> None:
+        await self.run(self.sync.clear_keywords, chat_id)
+
+    async def get_topics(self, chat_id: int) -> List[str]:
+        return await self.run(self.sync.get_topics, chat_id)
+
+    async def set_topics(self, chat_id: int, topics: List[str]) -> None:
+        await self.run(self.sync.set_topics, chat_id, topics)
+
+    async def clear_topics(self, chat_id: int) -> None:
+        await self.run(self.sync.clear_topics, chat_id)
+
+    async def get_auto_interval(self, chat_id: int) -> int:
+        return await self.run(self.sync.get_auto_interval, chat_id)
+
+    async def set_auto_interval(self, chat_id: int, interval_sec: int) -> None:
+        await self.run(self.sync.set_auto_interval, chat_id, interval_sec)
+
+    async def get_input_state(self, chat_id: int) -> str:
+        return await self.run(self.sync.get_input_state, chat_id)
+
+    async def set_input_state(self, chat_id: int, state: str) -> None:
+        await self.run(self.sync.set_input_state, chat_id, state)
+
+    async def get_all_chat_ids(self) -> List[int]:
+        return await self.run(self.sync.get_all_chat_ids)
+
+    # ---------- sent news ----------
+    async def filter_new_items(self, chat_id: int, items: List[Dict]) -> List[Dict]:
+        return await self.run(self.sync.filter_new_items, chat_id, items)
+
+    async def filter_new_items_many(self, batches: Dict[int, List[Dict]]) -> Dict[int, List[Dict]]:
+        return await self.run(self.sync.filter_new_items_many, batches)
+
+    async def clear_sent_news(self, chat_id: int) -> None:
+        await self.run(self.sync.clear_sent_news, chat_id)
+
+    # ---------- chat history ----------
+    async def add_chat_message(self, chat_id: int, role: str, content: str) -> None:
+        await self.run(self.sync.add_chat_message, chat_id, role, content)
+
+    async def get_chat_history(self, chat_id: int) -> List[Tuple[str, str]]:
+        return await self.run(self.sync.get_chat_history, chat_id)
+
+    # ---------- articles ----------
+    async def upsert_articles(self, items: List[Dict]) -> int:
+        return await self.run(self.sync.upsert_articles, items)
+
+    async def get_articles(
+        self,
+        topics: Optional[List[str]] = None,
+        per_topic: int = 100,
+        seen_since: int = 0,
+    ) -> List[Dict]:
+        return await self.run(self.sync.get_articles, topics=topics, per_topic=per_topic, seen_since=seen_since)
+
+    async def search_articles(
+        self,
+        query: str,
+        topics: Optional[List[str]] = None,
+        published_from: int = 0,
+        published_to: int = 0,
+        limit: int = 30,
+    ) -> List[Dict]:
+        return await self.run(
+            self.sync.search_articles,
+            query,
+            topics=topics,
+            published_from=published_from,
+            published_to=published_to,
+            limit=limit,
+        )
+
+
+async_storage = AsyncStorage(storage, workers=DB_ASYNC_WORKERS)
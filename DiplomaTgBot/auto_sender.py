@@ -3,16 +3,36 @@
 import threading
 import time
 import logging
+from typing import Dict, List, Optional, Tuple
 
 from bot_instance import bot
 from storage import storage
-from news_fetcher import fetch_news
-from config import AUTO_NEWS_INTERVAL_SEC, USE_LLM, DIGEST_ITEMS_LIMIT
+from ingestion import load_snapshot
+from subscription_index import index
+from scheduler import DueScheduler
+from delivery import create_delivery_pool
+from outbox import create_outbox_sender
+from leases import ShardLeases
+from config import (
+    AUTO_BATCH_SIZE,
+    AUTO_JITTER_SEC,
+    SENDER_SHARDS,
+    SENDER_LEASE_TTL_SEC,
+    USE_LLM,
+    OPENAI_MODEL,
+    DIGEST_ITEMS_LIMIT,
+)
 from utils_text import split_for_telegram, escape_html, html_link
 from llm_agent import build_digest_with_llm, select_relevant_items_with_llm
+from llm_cache import llm_cache
 
 logger = logging.getLogger(__name__)
 
+# Дайджести йдуть через пул доставки: ліміти Telegram, 429, порядок частин у чаті
+delivery = create_delivery_pool(bot.send_message)
+# ... але спершу пишуться в outbox, щоб збій між побудовою і відправкою не губив їх
+outbox = create_outbox_sender(delivery)
+
 
 def _build_fallback_digest_html(items):
     lines = []
@@ -29,75 +49,210 @@ def _build_fallback_digest_html(items):
     return "<b>Оновлення новин</b>\n\n" + "\n\n".join(lines)
 
 
+def _build_digest(new_items, keywords) -> Tuple[List[str], Optional[str], str]:
+    """Дайджест для списку нових статей: (частини для Telegram, parse_mode, текст для історії)."""
+    candidates = new_items[: max(12, DIGEST_ITEMS_LIMIT * 3)]
+
+    if USE_LLM:
+        try:
+            # ті самі кандидати й ключові слова (інша група, наступний цикл,
+            # інший процес) -> готовий дайджест з llm_cache без виклику API
+            digest_text = llm_cache.get_or_compute(
+                llm_cache.digest_key(OPENAI_MODEL, keywords, candidates),
+                lambda: build_digest_with_llm(
+                    select_relevant_items_with_llm(candidates, keywords, max_keep=DIGEST_ITEMS_LIMIT),
+                    keywords,
+                ),
+            )
+            return split_for_telegram(digest_text), None, digest_text
+        except Exception as exc:
+            logger.warning("LLM-дайджест не вдався, fallback: %s", exc)
+
+    # fallback HTML
+    digest_html = _build_fallback_digest_html(candidates[:DIGEST_ITEMS_LIMIT])
+    return split_for_telegram(digest_html), "HTML", digest_html
+
+
 class AutoNewsSender(threading.Thread):
-    def __init__(self, interval_sec: int) -> None:
+    """
+    Автонадсилання за персональним розкладом: кожен чат має свій
+    auto_interval_sec і збережений next_due_at. Потік спить до найближчого
+    строку (DueScheduler), обробляє чати, що настали, партіями по
+    batch_size і планує кожному наступний строк.
+    """
+
+    def __init__(self, batch_size: int, jitter_sec: int, leases: Optional[ShardLeases] = None) -> None:
         super().__init__(name="auto-news-sender", daemon=True)
-        self.interval_sec = max(60, interval_sec)
-        self._stop_flag = False
+        self.batch_size = max(1, batch_size)
+        self.scheduler = DueScheduler(jitter_sec)
+        # з leases процес обслуговує лише чати орендованих шардів
+        self.leases = leases
+        self._in_flight: set = set()
+        self._stop_event = threading.Event()
+        storage.on_schedule_changed(self._on_schedule_changed)
+        if leases is not None:
+            leases.on_change(self._on_leases_changed)
 
     def stop(self) -> None:
-        self._stop_flag = True
+        self._stop_event.set()
+        self.scheduler.wake()
+        if self.leases is not None:
+            self.leases.stop()
+
+    def _load_schedule(self, shards: Optional[List[int]] = None) -> None:
+        now = time.time()
+        if self.leases is None:
+            rows = storage.get_schedule()
+        else:
+            rows = storage.get_schedule(shard_count=self.leases.shard_count, shards=shards)
+        spread = []
+        for chat_id, due_at, interval in rows:
+            if due_at <= now:
+                # прострочені (простій бота, старі записи без next_due_at) розкидаємо,
+                # щоб не обробляти всіх одним залпом
+                due_at = int(now + abs(self.scheduler.jitter(interval)))
+                spread.append((chat_id, due_at))
+            self.scheduler.schedule(chat_id, due_at)
+        storage.set_next_due_many(spread)
+
+    def _on_leases_changed(self, gained: List[int], lost: List[int]) -> None:
+        if lost:
+            lost_set = set(lost)
+            self.scheduler.remove_where(lambda c: self.leases.shard_of(c) in lost_set)
+        if gained:
+            self._load_schedule(gained)
+
+        # зміни розкладу з інших процесів (новий користувач, інтервал у боті)
+        known = set(gained)
+        for chat_id, due_at, interval in storage.get_schedule(
+            shard_count=self.leases.shard_count,
+            shards=[s for s in self.leases.owned() if s not in known],
+        ):
+            if chat_id in self._in_flight:
+                continue
+            current = self.scheduler.due_of(chat_id)
+            if current is None or (due_at and int(current) != due_at):
+                self.scheduler.schedule(chat_id, due_at or time.time() + interval)
+
+    def _on_schedule_changed(self, chat_id: int) -> None:
+        if self.leases is not None and not self.leases.owns(chat_id):
+            return  # чат іншого шарду — його підхопить власник при поновленні оренди
+        # новий користувач або змінений інтервал
+        for _, due_at, interval in storage.get_schedule([chat_id]):
+            if not due_at:
+                # перший дайджест — через інтервал після підписки
+                due_at = int(time.time() + interval)
+                storage.set_next_due_many([(chat_id, due_at)])
+            self.scheduler.schedule(chat_id, due_at)
 
     def run(self) -> None:
-        logger.info("Фоновий агент автонадсилання новин запущений з інтервалом %s сек.", self.interval_sec)
-        while not self._stop_flag:
+        if self.leases is None:
+            self._load_schedule()
+        else:
+            self.leases.start()  # перше поновлення завантажить розклад отриманих шардів
+        logger.info("Фоновий агент автонадсилання новин запущений, чатів у розкладі: %d", len(self.scheduler))
+        while not self._stop_event.is_set():
+            now = time.time()
+            batch = self.scheduler.pop_due(now, self.batch_size)
+            if self.leases is not None:
+                # шард могли забрати між плануванням і строком; запас — на саму обробку
+                margin = self.leases.ttl_sec / 3
+                batch = [(c, d) for c, d in batch if self.leases.owns(c, margin_sec=margin)]
+            if not batch:
+                next_due = self.scheduler.next_due()
+                self.scheduler.wait(None if next_due is None else max(0.0, next_due - now))
+                continue
+
+            self._in_flight = {chat_id for chat_id, _ in batch}
             try:
-                self._run_cycle()
+                self._run_batch([chat_id for chat_id, _ in batch])
             except Exception as exc:
                 logger.exception("Помилка в автонадсиланні новин: %s", exc)
-            time.sleep(self.interval_sec)
+            self._reschedule(batch)
+            self._in_flight = set()
+
+    def _reschedule(self, batch) -> None:
+        now = time.time()
+        due_by_chat = dict(batch)
+        planned = []
+        for chat_id, _, interval in storage.get_schedule(list(due_by_chat)):
+            # від запланованого строку: тривалість обробки не зсуває розклад
+            next_due = due_by_chat[chat_id] + interval
+            if next_due <= now:
+                next_due = now + interval
+            next_due += self.scheduler.jitter(interval)
+            self.scheduler.schedule(chat_id, next_due)
+            planned.append((chat_id, int(next_due)))
+        storage.set_next_due_many(planned)
 
-    def _run_cycle(self) -> None:
-        chat_ids = storage.get_all_chat_ids()
-        if not chat_ids:
+    def _run_batch(self, chat_ids) -> None:
+        # Один знімок на партію (з таблиці articles)
+        snapshot = load_snapshot()
+        if not snapshot:
             return
 
-        logger.info("Запуск автооновлення новин для %d користувачів", len(chat_ids))
+        # Інвертований індекс підписок: кожна стаття перевіряється один раз і
+        # одразу потрапляє лише до зацікавлених чатів партії
+        index.refresh()
+        per_chat = index.fan_out(snapshot, limit_per_feed=8, chat_ids=chat_ids)
+        if not per_chat:
+            return
 
-        for chat_id in chat_ids:
-            keywords = storage.get_keywords(chat_id)
-            ignore_keywords = not bool(keywords)
+        logger.info("Автооновлення новин: партія %d чатів, зі збігами %d", len(chat_ids), len(per_chat))
 
-            items = fetch_news(
-                keywords=keywords,
-                limit_per_feed=8,
-                ignore_keywords=ignore_keywords,
-            )
+        # Дедуп проти sent_news для всіх чатів партії; позначаються надісланими
+        # лише разом із записом дайджесту в outbox (enqueue_digest)
+        fresh = storage.peek_new_items_many(per_chat)
+        stats = storage.sent_cache_stats()
+        logger.info(
+            "Кеш надісланих: hit rate %.1f%% (%d/%d), чатів %d, посилань %d",
+            stats["hit_rate"] * 100,
+            stats["hits"],
+            stats["hits"] + stats["misses"],
+            stats["chats"],
+            stats["links"],
+        )
 
-            if not items:
-                continue
-
-            new_items = storage.filter_new_items(chat_id, items)
+        # Чати з однаковим профілем (ключові слова, теми) і однаковим набором
+        # нових посилань отримують однаковий дайджест: будуємо його один раз
+        groups: Dict[tuple, List[int]] = {}
+        for chat_id in sorted(fresh):
+            new_items = fresh[chat_id]
             if not new_items:
                 continue
+            fingerprint = (index.profile_of(chat_id), frozenset(it.get("link", "") for it in new_items))
+            groups.setdefault(fingerprint, []).append(chat_id)
 
-            candidates = new_items[: max(12, DIGEST_ITEMS_LIMIT * 3)]
-
-            if USE_LLM:
-                try:
-                    chosen = select_relevant_items_with_llm(candidates, keywords, max_keep=DIGEST_ITEMS_LIMIT)
-                    digest_text = build_digest_with_llm(chosen, keywords)
-
-                    storage.add_chat_message(chat_id, "assistant", digest_text)
-
-                    for part in split_for_telegram(digest_text):
-                        bot.send_message(chat_id, part, disable_web_page_preview=True)
-                    continue
-
-                except Exception as exc:
-                    logger.warning("LLM-дайджест не вдався, fallback: %s", exc)
-
-            # fallback HTML
-            fallback_items = candidates[:DIGEST_ITEMS_LIMIT]
-            digest_html = _build_fallback_digest_html(fallback_items)
+        if groups:
+            logger.info("Дайджестів до побудови: %d на %d чатів", len(groups), sum(map(len, groups.values())))
 
-            storage.add_chat_message(chat_id, "assistant", digest_html)
+        queued = 0
+        for members in groups.values():
+            keywords = index.keywords_of(members[0])
+            parts, parse_mode, history_text = _build_digest(fresh[members[0]], keywords)
+            for chat_id in members:
+                # render — якщо частину посилань уже надіслав інший відправник
+                queued += storage.enqueue_digest(
+                    chat_id,
+                    fresh[chat_id],
+                    parts,
+                    parse_mode=parse_mode,
+                    history_text=history_text,
+                    render=lambda items, kw=keywords: _build_digest(items, kw),
+                )
 
-            for part in split_for_telegram(digest_html):
-                bot.send_message(chat_id, part, parse_mode="HTML", disable_web_page_preview=True)
+        if queued:
+            logger.info("Outbox: додано дайджестів %d", queued)
+            outbox.wake()
 
 
 def start_auto_sender() -> AutoNewsSender:
-    sender = AutoNewsSender(AUTO_NEWS_INTERVAL_SEC)
+    delivery.start()
+    outbox.start()
+    leases = ShardLeases(SENDER_SHARDS, SENDER_LEASE_TTL_SEC) if SENDER_SHARDS > 0 else None
+    if leases is not None:
+        # процеси ділять між собою ліміт Telegram на токен бота
+        leases.on_workers(delivery.set_share)
+    sender = AutoNewsSender(AUTO_BATCH_SIZE, AUTO_JITTER_SEC, leases=leases)
     sender.start()
     return sender
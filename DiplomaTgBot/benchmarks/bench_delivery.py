@@ -0,0 +1,145 @@
+# benchmarks/bench_delivery.py
+#
+# Доставка дайджестів через локальний імітатор Telegram Bot API з тими ж
+# обмеженнями, що й справжній: ~30 повідомлень/с на бота і 1/с на чат
+# (інакше 429 з retry_after), плюс затримка відповіді.
+# Порівнюються: послідовний bot.send_message (як було) і DeliveryPool.
+#
+# Запуск з каталогу DiplomaTgBot:
+#   python -m benchmarks.bench_delivery
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import telebot
+from telebot import apihelper
+
+from delivery import DeliveryPool
+
+CHATS = 60
+PARTS_PER_CHAT = 2
+LATENCY_SEC = 0.08
+GLOBAL_LIMIT = 30
+PER_CHAT_SEC = 1.0
+
+
+class FakeTelegram:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.window: deque = deque()
+        self.last_by_chat: dict = {}
+        self.received: dict = {}
+        self.rejected = 0
+
+    def accept(self, chat_id: int, text: str):
+        with self.lock:
+            now = time.monotonic()
+            while self.window and now - self.window[0] >= 1.0:
+                self.window.popleft()
+            last = self.last_by_chat.get(chat_id)
+            if len(self.window) >= GLOBAL_LIMIT or (last is not None and now - last < PER_CHAT_SEC * 0.95):
+                self.rejected += 1
+                return None
+            self.window.append(now)
+            self.last_by_chat[chat_id] = now
+            self.received.setdefault(chat_id, []).append(text)
+            return len(self.received[chat_id])
+
+
+def make_handler(api: FakeTelegram):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8")
+            params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+            params.update({k: v[0] for k, v in parse_qs(body).items()})
+            time.sleep(LATENCY_SEC)
+
+            chat_id = int(params.get("chat_id", 0))
+            message_id = api.accept(chat_id, params.get("text", ""))
+            if message_id is None:
+                code, payload = 429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after 1",
+                    "parameters": {"retry_after": 1},
+                }
+            else:
+                code, payload = 200, {
+                    "ok": True,
+                    "result": {
+                        "message_id": message_id,
+                        "date": int(time.time()),
+                        "chat": {"id": chat_id, "type": "private"},
+                        "text": params.get("text", ""),
+                    },
+                }
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def _digests():
+    return {chat_id: [f"{chat_id}:part{i}" for i in range(PARTS_PER_CHAT)] for chat_id in range(1, CHATS + 1)}
+
+
+def run_sequential(bot: telebot.TeleBot) -> int:
+    failed = 0
+    for chat_id, parts in _digests().items():
+        for part in parts:
+            try:
+                bot.send_message(chat_id, part)
+            except Exception:
+                failed += 1
+    return failed
+
+
+def run_pool(bot: telebot.TeleBot) -> int:
+    pool = DeliveryPool(bot.send_message, workers=8, global_rate=GLOBAL_LIMIT - 2, per_chat_interval=PER_CHAT_SEC)
+    pool.start()
+    for chat_id, parts in _digests().items():
+        pool.submit(chat_id, parts)
+    pool.wait_idle()
+    pool.stop()
+    return pool.stats()["failed"]
+
+
+def main() -> None:
+    logging.getLogger("delivery").setLevel(logging.ERROR)
+    total = CHATS * PARTS_PER_CHAT
+    print(f"{CHATS} чатів x {PARTS_PER_CHAT} частини, затримка API {LATENCY_SEC * 1000:.0f} мс, ліміти {GLOBAL_LIMIT}/с і 1/с на чат")
+    print(f"{'mode':>12} {'sec':>7} {'delivered':>10} {'failed':>7} {'429':>5} {'msg/s':>7} {'ordered':>8}")
+    for name, fn in (("sequential", run_sequential), ("pool", run_pool)):
+        api = FakeTelegram()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(api))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        apihelper.API_URL = f"http://127.0.0.1:{server.server_address[1]}/bot{{0}}/{{1}}"
+        bot = telebot.TeleBot("1:bench", threaded=False)
+
+        started = time.perf_counter()
+        failed = fn(bot)
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        delivered = sum(len(v) for v in api.received.values())
+        ordered = all(v == sorted(v) for v in api.received.values())
+        print(f"{name:>12} {elapsed:>7.2f} {delivered:>6}/{total:<3} {failed:>7} {api.rejected:>5} {delivered / elapsed:>7.1f} {str(ordered):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_rss_parse.py
+#
+# Порівняння розбору RSS: feedparser (повний документ) проти потокового
+# rss_stream з зупинкою після limit_per_feed записів.
+#
+# Запуск з каталогу DiplomaTgBot:
+#   python -m benchmarks.bench_rss_parse
+
+from __future__ import annotations
+
+import time
+from itertools import islice
+from typing import Callable, List
+
+import feedparser
+
+from rss_stream import iter_rss_entries
+
+CHUNK_SIZE = 16384
+LIMIT_PER_FEED = 8
+
+
+def build_feed(n_items: int) -> bytes:
+    # Формою схоже на Google News RSS: HTML в description, source, guid
+    items = []
+    for i in range(n_items):
+        items.append(
+            f"<item><title>Новина номер {i} - Видання {i % 17}</title>"
+            f"<link>https://news.google.com/rss/articles/CBMi{i:08d}AbCdEf?oc=5</link>"
+            f'<guid isPermaLink="false">CBMi{i:08d}</guid>'
+            f"<pubDate>Mon, 13 Oct 2026 10:{i % 60:02d}:00 GMT</pubDate>"
+            f"<description>&lt;a href=\"https://news.google.com/rss/articles/CBMi{i:08d}\" target=\"_blank\"&gt;"
+            f"Новина номер {i}&lt;/a&gt;&amp;nbsp;&amp;nbsp;&lt;font color=\"#6f6f6f\"&gt;Видання {i % 17}&lt;/font&gt;</description>"
+            f'<source url="https://example{i % 17}.ua">Видання {i % 17}</source></item>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<rss version="2.0"><channel><title>Bench</title>' + "".join(items) + "</channel></rss>"
+    ).encode("utf-8")
+
+
+def _chunks(data: bytes):
+    for i in range(0, len(data), CHUNK_SIZE):
+        yield data[i : i + CHUNK_SIZE]
+
+
+def feedparser_limited(data: bytes) -> List:
+    return feedparser.parse(data).entries[:LIMIT_PER_FEED]
+
+
+def stream_limited(data: bytes) -> List:
+    return list(islice(iter_rss_entries(_chunks(data)), LIMIT_PER_FEED))
+
+
+def stream_full(data: bytes) -> List:
+    return list(iter_rss_entries(_chunks(data)))
+
+
+def _bench(fn: Callable[[bytes], List], data: bytes, rounds: int) -> float:
+    fn(data)  # прогрів
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn(data)
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def main() -> None:
+    print(f"{'items':>6} {'KB':>7} {'feedparser ms':>14} {'stream@limit ms':>16} {'stream full ms':>15} {'speedup':>8}")
+    for n_items, rounds in ((100, 30), (1000, 5), (5000, 2)):
+        data = build_feed(n_items)
+        fp = _bench(feedparser_limited, data, rounds)
+        sl = _bench(stream_limited, data, rounds)
+        sf = _bench(stream_full, data, rounds)
+        print(f"{n_items:>6} {len(data) // 1024:>7} {fp:>14.2f} {sl:>16.2f} {sf:>15.2f} {fp / sl:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
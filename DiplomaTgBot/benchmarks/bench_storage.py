@@ -0,0 +1,111 @@
+# benchmarks/bench_storage.py
+#
+# Пропускна здатність Storage на навантаженні, схожому на handle_text
+# (кілька getter/setter на одне повідомлення), поки паралельно пише
+# автонадсилання. Порівнюються: старий режим (нове зʼєднання на кожен
+# виклик, rollback journal) і пул зʼєднань з WAL.
+#
+# Запуск з каталогу DiplomaTgBot:
+#   python -m benchmarks.bench_storage
+
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+_TMP = tempfile.mkdtemp(prefix="bench_storage_")
+# модуль storage створює глобальний Storage(DB_PATH) при імпорті — не чіпаємо робочу БД
+os.environ["DB_PATH"] = os.path.join(_TMP, "import.sqlite3")
+
+from storage import Storage  # noqa: E402
+
+DURATION_SEC = 3.0
+CHATS = 200
+READER_THREADS = 4
+
+
+class LegacyStorage(Storage):
+    """Як було до пулу: sqlite3.connect на кожен виклик, журнал DELETE."""
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+
+def _make(cls, name: str) -> Storage:
+    path = os.path.join(_TMP, name)
+    st = cls(path)
+    if cls is LegacyStorage:
+        con = sqlite3.connect(path)
+        con.execute("PRAGMA journal_mode=DELETE")
+        con.close()
+    for chat_id in range(CHATS):
+        st.add_user_if_not_exists(chat_id)
+    return st
+
+
+def _handle_message(st: Storage, chat_id: int) -> int:
+    # один текстовий запит: 5 звернень до БД
+    st.add_user_if_not_exists(chat_id)
+    st.get_input_state(chat_id)
+    st.get_keywords(chat_id)
+    st.set_input_state(chat_id, "")
+    st.add_chat_message(chat_id, "user", "привіт")
+    return 5
+
+
+def _auto_sender(st: Storage, stop: threading.Event, counter: list) -> None:
+    n = 0
+    while not stop.is_set():
+        batch = {
+            chat_id: [{"link": f"https://bench/{chat_id}/{n}/{i}"} for i in range(8)]
+            for chat_id in random.sample(range(CHATS), 20)
+        }
+        st.filter_new_items_many(batch)
+        n += 1
+    counter.append(n)
+
+
+def run(st: Storage) -> tuple:
+    stop = threading.Event()
+    ops = [0] * READER_THREADS
+    errors = [0] * READER_THREADS
+    cycles: list = []
+
+    def reader(idx: int) -> None:
+        rnd = random.Random(idx)
+        while not stop.is_set():
+            try:
+                ops[idx] += _handle_message(st, rnd.randrange(CHATS))
+            except sqlite3.OperationalError:  # database is locked
+                errors[idx] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READER_THREADS)]
+    threads.append(threading.Thread(target=_auto_sender, args=(st, stop, cycles)))
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(DURATION_SEC)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return sum(ops) / elapsed, sum(errors), (cycles[0] if cycles else 0) / elapsed
+
+
+def main() -> None:
+    print(f"{READER_THREADS} потоки-обробники + 1 автонадсилання, {DURATION_SEC:.0f} с на режим")
+    print(f"{'mode':>22} {'ops/s':>10} {'locked':>8} {'sender cycles/s':>16}")
+    results = {}
+    for name, cls in (("connect per call", LegacyStorage), ("pool + WAL", Storage)):
+        ops, errors, cycles = run(_make(cls, name.replace(" ", "_") + ".sqlite3"))
+        results[name] = ops
+        print(f"{name:>22} {ops:>10.0f} {errors:>8} {cycles:>16.1f}")
+    print(f"speedup: {results['pool + WAL'] / results['connect per call']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
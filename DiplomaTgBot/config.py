@@ -7,6 +7,14 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 
 # --- DB ---
 DB_PATH = os.getenv("DB_PATH", "bot_data.sqlite3")
+# пул зʼєднань Storage і налаштування SQLite
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 16384))  # кеш сторінок на зʼєднання
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 64 * 1024 * 1024))
+DB_CACHED_STATEMENTS = int(os.getenv("DB_CACHED_STATEMENTS", 256))
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 10000))  # профілів користувачів у памʼяті
+DB_ASYNC_WORKERS = int(os.getenv("DB_ASYNC_WORKERS", 4))  # потоки БД для AsyncStorage (web API)
 
 # --- Logging ---
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -21,9 +29,72 @@ def setup_logging() -> None:
 REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 8))
 MAX_ITEMS_TOTAL = int(os.getenv("MAX_ITEMS_TOTAL", 60))
 MAX_FETCH_DURATION_SEC = float(os.getenv("MAX_FETCH_DURATION_SEC", 20))
+# Скільки RSS-джерел завантажуємо паралельно (1 = послідовно, як раніше)
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", 8))
+# Розмір шматка при потоковому читанні RSS
+RSS_CHUNK_SIZE = int(os.getenv("RSS_CHUNK_SIZE", 16384))
+# після ліміту записів решту тіла дочитуємо до цього розміру: keep-alive і кеш умовного GET
+RSS_DRAIN_MAX_BYTES = int(os.getenv("RSS_DRAIN_MAX_BYTES", 2 * 1024 * 1024))
+# Скільки статей тримаємо в кеші нормалізації (очищений текст, токени)
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", 5000))
+# Дедуп історій між темами: розмір індексу SimHash і макс. відстань Хеммінга
+DEDUP_INDEX_SIZE = int(os.getenv("DEDUP_INDEX_SIZE", 20000))
+DEDUP_SIMHASH_DISTANCE = int(os.getenv("DEDUP_SIMHASH_DISTANCE", 3))
+
+# --- Health джерел (circuit breaker + адаптивні таймаути) ---
+SOURCE_HEALTH_WINDOW = int(os.getenv("SOURCE_HEALTH_WINDOW", 20))  # скільки останніх запитів враховуємо
+SOURCE_BREAKER_THRESHOLD = int(os.getenv("SOURCE_BREAKER_THRESHOLD", 3))  # помилок поспіль до відкриття
+SOURCE_BREAKER_COOLDOWN_SEC = float(os.getenv("SOURCE_BREAKER_COOLDOWN_SEC", 300))
+SOURCE_TIMEOUT_MIN = float(os.getenv("SOURCE_TIMEOUT_MIN", 2))
+SOURCE_TIMEOUT_P95_FACTOR = float(os.getenv("SOURCE_TIMEOUT_P95_FACTOR", 2))
+
+# --- HTTP client (спільна keep-alive сесія) ---
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))  # скільки хостів тримаємо в пулі
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 8))  # макс. зʼєднань на один хост
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 2))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))
+
+# --- Ingestion (фоновий збір у таблицю articles) ---
+INGEST_ENABLED = os.getenv("INGEST_ENABLED", "1") == "1"
+INGEST_INTERVAL_SEC = int(os.getenv("INGEST_INTERVAL_SEC", 300))
+INGEST_IN_API = os.getenv("INGEST_IN_API", "0") == "1"  # 0 — збирає лише бот, API читають спільну БД
+ARTICLES_PER_TOPIC = int(os.getenv("ARTICLES_PER_TOPIC", 100))  # скільки останніх статей теми читаємо
+ARTICLES_WINDOW_SEC = int(os.getenv("ARTICLES_WINDOW_SEC", 2 * 24 * 3600))  # статті, побачені за цей час
+ARTICLES_RETENTION_DAYS = float(os.getenv("ARTICLES_RETENTION_DAYS", 30))  # старіші видаляє обслуговування (і з пошуку)
+
+# --- Maintenance (фонове обслуговування БД) ---
+MAINTENANCE_INTERVAL_SEC = int(os.getenv("MAINTENANCE_INTERVAL_SEC", 3600))
+# скільки памʼятаємо надіслані посилання (не менше за ARTICLES_WINDOW_SEC)
+SENT_NEWS_RETENTION_SEC = int(os.getenv("SENT_NEWS_RETENTION_SEC", 14 * 24 * 3600))
+SENT_NEWS_PRUNE_BATCH = int(os.getenv("SENT_NEWS_PRUNE_BATCH", 5000))  # рядків за одну транзакцію
+CHAT_HISTORY_TRIM = os.getenv("CHAT_HISTORY_TRIM", "1") == "1"  # прибирати історію після зміни CHAT_HISTORY_LIMIT
+# кеш уже надісланих посилань перед sent_news: хешів на чат і макс. чатів
+SENT_CACHE_PER_CHAT = int(os.getenv("SENT_CACHE_PER_CHAT", 512))
+SENT_CACHE_MAX_CHATS = int(os.getenv("SENT_CACHE_MAX_CHATS", 5000))
 
 # --- Auto sender ---
 AUTO_NEWS_INTERVAL_SEC = int(os.getenv("AUTO_NEWS_INTERVAL_SEC", 1800))
+# планувальник: скільки чатів обробляємо за раз і макс. випадковий зсув строку
+AUTO_BATCH_SIZE = int(os.getenv("AUTO_BATCH_SIZE", 50))
+AUTO_JITTER_SEC = int(os.getenv("AUTO_JITTER_SEC", 60))
+# шардинг автонадсилання між процесами: 0 — один відправник на всіх (як раніше)
+SENDER_SHARDS = int(os.getenv("SENDER_SHARDS", 0))
+SENDER_LEASE_TTL_SEC = float(os.getenv("SENDER_LEASE_TTL_SEC", 30))
+AUTO_SENDER_IN_BOT = os.getenv("AUTO_SENDER_IN_BOT", "1") == "1"  # 0 — лише окремі sender_worker.py
+
+# --- Delivery (пул надсилання в Telegram) ---
+DELIVERY_WORKERS = int(os.getenv("DELIVERY_WORKERS", 8))
+DELIVERY_GLOBAL_RATE = float(os.getenv("DELIVERY_GLOBAL_RATE", 30))  # повідомлень/с на бота
+DELIVERY_PER_CHAT_INTERVAL = float(os.getenv("DELIVERY_PER_CHAT_INTERVAL", 1.0))  # с між повідомленнями в чат
+DELIVERY_MAX_RETRIES = int(os.getenv("DELIVERY_MAX_RETRIES", 3))
+
+# --- Outbox (дайджести спершу пишуться в БД, потім надсилаються) ---
+OUTBOX_POLL_SEC = float(os.getenv("OUTBOX_POLL_SEC", 2.0))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", 200))
+OUTBOX_CLAIM_SEC = int(os.getenv("OUTBOX_CLAIM_SEC", 300))  # після цього зависле 'sending' забирається знову
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_MAX_IN_FLIGHT = int(os.getenv("OUTBOX_MAX_IN_FLIGHT", 50))  # частин у черзі пулу доставки
+OUTBOX_RETENTION_SEC = int(os.getenv("OUTBOX_RETENTION_SEC", 7 * 24 * 3600))
 
 # --- Digest ---
 DIGEST_ITEMS_LIMIT = int(os.getenv("DIGEST_ITEMS_LIMIT", 6))
@@ -37,6 +108,12 @@ LLM_MAX_INPUT_CHARS = int(os.getenv("LLM_MAX_INPUT_CHARS", 3500))
 USE_LLM = os.getenv("USE_LLM", "1") == "1"
 CHAT_HISTORY_LIMIT = int(os.getenv("CHAT_HISTORY_LIMIT", 20))
 
+# --- Кеш LLM (однакові запити не йдуть в API повторно) ---
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL_SEC = int(os.getenv("LLM_CACHE_TTL_SEC", 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 20000))  # у SQLite, понад — LRU
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", 1024))  # у памʼяті процесу
+
 # --- CORS ---
 # приклад: "https://newswebapp-pied.vercel.app,http://localhost:3000"
 CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").strip()
@@ -0,0 +1,210 @@
+# dedup.py
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from config import DEDUP_INDEX_SIZE, DEDUP_SIMHASH_DISTANCE
+
+WORD_RE = re.compile(r"\w+")
+
+# Google News: /rss/articles/<ID>, /articles/<ID>, /__i/rss/rd/articles/<ID>
+GNEWS_ARTICLE_RE = re.compile(r"/articles/([A-Za-z0-9_-]+)")
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "yclid", "dclid", "msclkid", "igshid",
+    "mc_cid", "mc_eid", "ref", "ref_src", "_ga", "oc",
+}
+
+_BANDS = 4
+_BAND_BITS = 64 // _BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+
+def canonical_url(link: str) -> str:
+    """
+    Канонічний ключ статті: для Google News — ID статті (різні redirect-URL
+    однієї статті дають один ключ), для решти — URL без трекінг-параметрів,
+    фрагмента, www і кінцевого слеша, з відсортованими параметрами.
+    """
+    link = (link or "").strip()
+    if not link:
+        return ""
+
+    try:
+        parts = urlsplit(link)
+    except ValueError:
+        return link
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+
+    if host == "news.google.com":
+        m = GNEWS_ARTICLE_RE.search(parts.path)
+        if m:
+            return f"gnews:{m.group(1)}"
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(((parts.scheme or "https").lower(), host, path, urlencode(query), ""))
+
+
+def _key_hash(key: str) -> int:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def link_hash(link: str) -> int:
+    """Фіксований 64-бітний (signed, як INTEGER у SQLite) хеш канонічного URL."""
+    return _key_hash(canonical_url(link))
+
+
+def item_hash(item: Dict) -> Optional[int]:
+    """
+    Ключ статті в sent_news: хеш dedup_key її історії, якщо стаття пройшла
+    dedup_items, інакше — хеш посилання. Представником історії в різних
+    циклах може бути різна копія, а dedup_key лишається тим самим, тож
+    історія не надсилається вдруге. Для статті без копій dedup_key — її ж
+    канонічний URL, і хеш збігається з link_hash. None — немає ні того, ні
+    іншого.
+    """
+    key = item.get("dedup_key") or canonical_url(item.get("link", ""))
+    return _key_hash(key) if key else None
+
+
+def _title_features(title: str) -> List[str]:
+    title = (title or "").lower()
+    # Google News додає " - Видання" в кінець заголовка
+    head, sep, tail = title.rpartition(" - ")
+    if sep and head and len(tail) <= 40:
+        title = head
+
+    words = WORD_RE.findall(title)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def title_fingerprint(title: str) -> Optional[int]:
+    """64-бітний SimHash заголовка (слова + біграми). None для надто коротких."""
+    features = _title_features(title)
+    if len(features) < 5:  # < 3 слів — занадто мало, щоб впевнено склеювати
+        return None
+
+    weights = [0] * 64
+    for f in features:
+        h = int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    fp = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fp |= 1 << bit
+    return fp
+
+
+class NearDupIndex:
+    """
+    Обмежений за памʼяттю індекс: канонічний ключ -> (SimHash, ключ кластера).
+    Кандидатів шукаємо по 4 смугах по 16 біт: якщо відстань Хеммінга <= 3,
+    хоча б одна смуга збігається повністю. Найстаріші записи витісняються.
+    """
+
+    def __init__(self, max_size: int, max_distance: int) -> None:
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[str, Tuple[Optional[int], str]]" = OrderedDict()
+        self._bands: List[Dict[int, Set[str]]] = [{} for _ in range(_BANDS)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cluster_of(self, key: str, fingerprint: Optional[int]) -> str:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                return hit[1]
+
+            cluster = key
+            if fingerprint is not None:
+                best_distance = self.max_distance + 1
+                for b in range(_BANDS):
+                    band = (fingerprint >> (b * _BAND_BITS)) & _BAND_MASK
+                    for other in self._bands[b].get(band, ()):
+                        other_fp, other_cluster = self._entries[other]
+                        distance = (fingerprint ^ other_fp).bit_count()
+                        if distance < best_distance:
+                            best_distance = distance
+                            cluster = other_cluster
+
+            self._entries[key] = (fingerprint, cluster)
+            if fingerprint is not None:
+                for b in range(_BANDS):
+                    band = (fingerprint >> (b * _BAND_BITS)) & _BAND_MASK
+                    self._bands[b].setdefault(band, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                self._evict_oldest()
+            return cluster
+
+    def _evict_oldest(self) -> None:
+        key, (fingerprint, _) = self._entries.popitem(last=False)
+        if fingerprint is None:
+            return
+        for b in range(_BANDS):
+            band = (fingerprint >> (b * _BAND_BITS)) & _BAND_MASK
+            bucket = self._bands[b].get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[b][band]
+
+
+_index = NearDupIndex(DEDUP_INDEX_SIZE, DEDUP_SIMHASH_DISTANCE)
+
+
+def dedup_items(items: List[Dict]) -> List[Dict]:
+    """
+    Залишає по одному представнику на історію. Ключ історії (dedup_key) —
+    канонічний URL першої побаченої статті кластера; представник отримує
+    списки topics / topic_keys усіх тем, де історія трапилась.
+    Вхідні dict-и не змінюються (знімок спільний для всіх користувачів).
+    """
+    reps: Dict[str, Dict] = {}
+    unique: List[Dict] = []
+
+    for item in items:
+        key = canonical_url(item.get("link", ""))
+        if not key:
+            unique.append(item)
+            continue
+
+        cluster = _index.cluster_of(key, title_fingerprint(item.get("title", "")))
+        rep = reps.get(cluster)
+        if rep is None:
+            rep = dict(item)
+            rep["dedup_key"] = cluster
+            rep["topics"] = [item.get("topic", "")]
+            rep["topic_keys"] = [item.get("topic_key", "")]
+            reps[cluster] = rep
+            unique.append(rep)
+            continue
+
+        topic_key = item.get("topic_key", "")
+        if topic_key not in rep["topic_keys"]:
+            rep["topic_keys"].append(topic_key)
+            rep["topics"].append(item.get("topic", ""))
+
+    return unique
@@ -0,0 +1,284 @@
+# delivery.py
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from telebot.apihelper import ApiTelegramException
+
+from config import (
+    DELIVERY_WORKERS,
+    DELIVERY_GLOBAL_RATE,
+    DELIVERY_PER_CHAT_INTERVAL,
+    DELIVERY_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# (текст, kwargs для send_message, спроба, on_send, on_done)
+Message = Tuple[
+    str,
+    Dict[str, Any],
+    int,
+    Optional[Callable[[], bool]],
+    Optional[Callable[[bool, Optional[str], bool], None]],
+]
+
+# Помилки Bot API, які повтор не виправить: 400 (chat not found, невалідна
+# розмітка), 403 (бота заблоковано / видалено з групи)
+PERMANENT_ERROR_CODES = frozenset({400, 403})
+
+
+class TokenBucket:
+    """
+    Глобальний ліміт: rate токенів/с, запас до capacity. acquire() чекає на
+    токен. За замовчуванням запас 1 — рівномірний темп без сплесків, бо
+    Telegram рахує ліміт у ковзному вікні.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        self.rate = max(0.001, rate)
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self.rate = max(0.001, rate)
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DeliveryPool:
+    """
+    Пул доставки повідомлень у Telegram.
+
+    - глобальний token bucket (~30 повідомлень/с на бота);
+    - не частіше одного повідомлення на чат за per_chat_interval;
+    - 429: чат відкладається на retry_after, повідомлення повторюється;
+    - порядок частин у межах чату зберігається: чат одночасно обробляє
+      лише один воркер, а черга чату — FIFO.
+
+    Чати, готові до відправки, лежать у купі (ready_at, seq, chat_id);
+    повільна відповідь чи 429 одного чату не блокує інші. Інтервал чату
+    памʼятається і після спорожніння черги: частини, що приходять з outbox
+    по одній, теж не йдуть частіше за per_chat_interval.
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., Any],
+        workers: int = 8,
+        global_rate: float = 30.0,
+        per_chat_interval: float = 1.0,
+        max_retries: int = 3,
+    ) -> None:
+        self.send = send
+        self.workers = max(1, workers)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.global_rate = global_rate
+        self.bucket = TokenBucket(global_rate)
+
+        self._queues: Dict[int, Deque[Message]] = {}
+        self._ready: List[Tuple[float, int, int]] = []
+        self._active: set = set()  # чати в купі або у воркера
+        self._not_before: Dict[int, float] = {}  # чат без черги -> коли можна наступне
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def set_share(self, processes: int) -> None:
+        """
+        Ліміт global_rate — на токен бота, а не на процес: коли надсилають
+        кілька sender_worker, кожен бере свою частку global_rate / processes.
+        """
+        processes = max(1, processes)
+        self.bucket.set_rate(self.global_rate / processes)
+        logger.info("Доставка: процесів %d, ліміт цього процесу %.1f повідомлень/с", processes, self.global_rate / processes)
+
+    def start(self) -> "DeliveryPool":
+        with self._cond:
+            if self._threads:
+                return self
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"delivery-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def submit(
+        self,
+        chat_id: int,
+        parts: List[str],
+        on_done: Optional[Callable[[bool, Optional[str], bool], None]] = None,
+        on_send: Optional[Callable[[], bool]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Ставить частини повідомлення в чергу чату (порядок зберігається).
+        on_send() викликається перед кожною спробою send_message; False —
+        повідомлення вже неактуальне (напр. рядок outbox забрав інший
+        процес) і відкидається без on_done. on_done(ok, error, permanent) — для
+        кожної частини після остаточного результату (надіслано або спроби
+        вичерпано); permanent — помилку повтор не виправить (400/403).
+        """
+        parts = [p for p in parts if p]
+        if not parts:
+            return
+        with self._cond:
+            queue = self._queues.setdefault(chat_id, deque())
+            queue.extend((p, kwargs, 0, on_send, on_done) for p in parts)
+            self._pending += len(parts)
+            if chat_id not in self._active:
+                self._active.add(chat_id)
+                ready_at = max(time.monotonic(), self._not_before.pop(chat_id, 0.0))
+                heapq.heappush(self._ready, (ready_at, next(self._seq), chat_id))
+                self._cond.notify()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Чекає, поки черги спорожніють (для тестів і коректної зупинки)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "pending": self._pending,
+                "chats": len(self._active),
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "skipped": self.skipped,
+            }
+
+    # ---------- воркер ----------
+    def _take(self) -> Optional[Tuple[int, Message]]:
+        with self._cond:
+            while not self._stopped:
+                if not self._ready:
+                    self._cond.wait()
+                    continue
+                ready_at, _, chat_id = self._ready[0]
+                delay = ready_at - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                heapq.heappop(self._ready)
+                return chat_id, self._queues[chat_id].popleft()
+        return None
+
+    def _release(self, chat_id: int, ready_at: float, outcome: str, retry: Optional[Message] = None) -> None:
+        with self._cond:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            queue = self._queues[chat_id]
+            if retry is not None:
+                queue.appendleft(retry)
+            else:
+                self._pending -= 1
+            if queue:
+                heapq.heappush(self._ready, (ready_at, next(self._seq), chat_id))
+            else:
+                del self._queues[chat_id]
+                self._active.discard(chat_id)
+                self._remember_interval(chat_id, ready_at)
+            self._cond.notify_all()
+
+    def _remember_interval(self, chat_id: int, ready_at: float) -> None:
+        # викликається під self._cond
+        now = time.monotonic()
+        if ready_at > now:
+            self._not_before[chat_id] = ready_at
+        if len(self._not_before) > 10000:
+            self._not_before = {c: t for c, t in self._not_before.items() if t > now}
+
+    def _worker(self) -> None:
+        while True:
+            taken = self._take()
+            if taken is None:
+                return
+            chat_id, (text, kwargs, attempt, on_send, on_done) = taken
+
+            self.bucket.acquire()
+            if on_send is not None:
+                try:
+                    wanted = on_send()
+                except Exception as exc:
+                    logger.exception("Помилка в on_send для чату %s: %s", chat_id, exc)
+                    wanted = False
+                if not wanted:
+                    self._release(chat_id, time.monotonic(), "skipped")
+                    continue
+
+            try:
+                self.send(chat_id, text, **kwargs)
+            except ApiTelegramException as exc:
+                if exc.error_code == 429 and attempt < self.max_retries:
+                    retry_after = float((exc.result_json.get("parameters") or {}).get("retry_after", 1))
+                    logger.warning("Telegram 429 для чату %s, повтор через %.0f с", chat_id, retry_after)
+                    self._release(chat_id, time.monotonic() + retry_after, "retried", (text, kwargs, attempt + 1, on_send, on_done))
+                    continue
+                logger.warning("Не вдалося надіслати в чат %s: %s", chat_id, exc)
+                outcome, error = "failed", str(exc)
+                permanent = exc.error_code in PERMANENT_ERROR_CODES
+            except Exception as exc:
+                if attempt < self.max_retries:
+                    # мережеві збої: короткий backoff і повтор того самого повідомлення
+                    self._release(chat_id, time.monotonic() + 2 ** attempt, "retried", (text, kwargs, attempt + 1, on_send, on_done))
+                    continue
+                logger.warning("Не вдалося надіслати в чат %s: %s", chat_id, exc)
+                outcome, error, permanent = "failed", str(exc), False
+            else:
+                outcome, error, permanent = "sent", None, False
+
+            if on_done is not None:
+                try:
+                    on_done(outcome == "sent", error, permanent)
+                except Exception as exc:
+                    logger.exception("Помилка в on_done для чату %s: %s", chat_id, exc)
+            self._release(chat_id, time.monotonic() + self.per_chat_interval, outcome)
+
+
+def create_delivery_pool(send: Callable[..., Any]) -> DeliveryPool:
+    return DeliveryPool(
+        send,
+        workers=DELIVERY_WORKERS,
+        global_rate=DELIVERY_GLOBAL_RATE,
+        per_chat_interval=DELIVERY_PER_CHAT_INTERVAL,
+        max_retries=DELIVERY_MAX_RETRIES,
+    )
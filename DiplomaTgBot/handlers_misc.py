@@ -44,7 +44,7 @@ def handle_text(message: Message) -> None:
         bot.send_message(chat_id, "Використайте кнопки меню.", reply_markup=main_menu_kb())
         return
 
-    state = storage.get_input_state(chat_id)
+    state = storage.get_profile(chat_id).input_state
 
     # --------- СТАНИ ВВОДУ ----------
     if state == "await_keywords":
@@ -5,7 +5,7 @@ from telebot.types import Message
 
 from bot_instance import bot
 from storage import storage
-from news_fetcher import fetch_news
+from ingestion import get_news
 from config import USE_LLM, DIGEST_ITEMS_LIMIT
 from utils_text import split_for_telegram, escape_html, html_link
 from llm_agent import build_digest_with_llm, select_relevant_items_with_llm
@@ -32,8 +32,9 @@ def handle_news_command(message: Message) -> None:
     chat_id = message.chat.id
     storage.add_user_if_not_exists(chat_id)
 
-    keywords = storage.get_keywords(chat_id)
-    topics = storage.get_topics(chat_id)
+    profile = storage.get_profile(chat_id)
+    keywords = list(profile.keywords)
+    topics = list(profile.topics)
 
     if keywords:
         bot.send_message(chat_id, f"Ключові слова: {', '.join(keywords)}")
@@ -45,7 +46,7 @@ def handle_news_command(message: Message) -> None:
     else:
         bot.send_message(chat_id, "Теми не задані. Надсилаю новини з усіх тем.")
 
-    items = fetch_news(
+    items = get_news(
         keywords=keywords,
         limit_per_feed=6,
         ignore_keywords=not bool(keywords),
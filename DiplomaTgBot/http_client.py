@@ -0,0 +1,64 @@
+# http_client.py
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_FACTOR,
+)
+
+USER_AGENT = "Mozilla/5.0 (compatible; DiplomaNewsBot/1.0)"
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # pool_block=True: не більше HTTP_POOL_MAXSIZE одночасних зʼєднань на хост,
+    # решта запитів чекає вільне зʼєднання замість відкривати нове.
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+        pool_block=True,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Єдина keep-alive сесія для бота і web API: зʼєднання до news.google.com
+    перевикористовуються між запитами замість нового TLS-рукостискання.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_session().get(url, **kwargs)
@@ -0,0 +1,224 @@
+# ingestion.py
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from storage import storage
+from async_storage import async_storage
+from news_fetcher import fetch_news, fetch_snapshot, filter_items
+from normalizer import normalize_clean
+from dedup import dedup_items
+from config import (
+    NEWS_SOURCES,
+    INGEST_ENABLED,
+    INGEST_INTERVAL_SEC,
+    ARTICLES_PER_TOPIC,
+    ARTICLES_WINDOW_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+_SOURCES_BY_KEY = {s["key"]: s for s in NEWS_SOURCES}
+
+
+def ingest_once() -> int:
+    items = fetch_snapshot()
+    if not items:
+        return 0
+    return storage.upsert_articles(items)
+
+
+class ArticleIngestor(threading.Thread):
+    """
+    Фоновий збір: за власним розкладом опитує NEWS_SOURCES і зберігає
+    статті в таблицю articles. Читачі (хендлери, автонадсилання, API)
+    беруть новини з БД і не ходять у мережу на шляху запиту.
+    """
+
+    def __init__(self, interval_sec: int) -> None:
+        super().__init__(name="article-ingestor", daemon=True)
+        self.interval_sec = max(30, interval_sec)
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        logger.info("Фоновий збір статей запущений з інтервалом %s сек.", self.interval_sec)
+        while not self._stop_event.is_set():
+            started = time.time()
+            try:
+                added = ingest_once()
+                logger.info("Збір статей: нових %d за %.1f сек.", added, time.time() - started)
+            except Exception as exc:
+                logger.exception("Помилка фонового збору статей: %s", exc)
+            self._stop_event.wait(self.interval_sec)
+
+
+def _iso(ts: int) -> str:
+    if not ts:
+        return ""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _to_item(row: Dict) -> Dict:
+    src = _SOURCES_BY_KEY.get(row["topic_key"], {})
+    _, _, search_text, tokens = normalize_clean(row["link"], row["title"], row["summary"])
+    return {
+        "source": "Google News",
+        "topic": src.get("topic", "Тема"),
+        "topic_key": row["topic_key"],
+        "query": src.get("query", ""),
+        "title": row["title"],
+        "summary": row["summary"],
+        "content": "",
+        "link": row["link"],
+        "published": _iso(row["published_at"]),
+        "published_at": row["published_at"],
+        "search_text": search_text,
+        "tokens": tokens,
+    }
+
+
+def load_snapshot(selected_topics: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Знімок зі збережених статей у форматі news_fetcher (для filter_items).
+    Якщо таблиця ще порожня (перший запуск) — збираємо наживо.
+    """
+    if not INGEST_ENABLED:
+        return fetch_snapshot()
+
+    topics = [t.strip().lower() for t in (selected_topics or []) if t.strip()]
+    rows = storage.get_articles(
+        topics=topics or None,
+        per_topic=ARTICLES_PER_TOPIC,
+        seen_since=int(time.time()) - ARTICLES_WINDOW_SEC,
+    )
+    if rows:
+        return [_to_item(r) for r in rows]
+    return _warm_snapshot()
+
+
+def _warm_snapshot() -> List[Dict]:
+    logger.info("Таблиця articles порожня — збираємо новини наживо.")
+    items = fetch_snapshot()
+    storage.upsert_articles(items)
+    return items
+
+
+def get_news(
+    keywords: List[str],
+    limit_per_feed: int = 6,
+    ignore_keywords: bool = False,
+    selected_topics: Optional[List[str]] = None,
+) -> List[Dict]:
+    """Аналог fetch_news, але з таблиці articles замість мережі."""
+    if not INGEST_ENABLED:
+        return fetch_news(
+            keywords=keywords,
+            limit_per_feed=limit_per_feed,
+            ignore_keywords=ignore_keywords,
+            selected_topics=selected_topics,
+        )
+
+    return filter_items(
+        load_snapshot(selected_topics),
+        keywords=keywords,
+        limit_per_feed=limit_per_feed,
+        ignore_keywords=ignore_keywords,
+        selected_topics=selected_topics,
+    )
+
+
+def search_news(
+    query: str,
+    selected_topics: Optional[List[str]] = None,
+    published_from: int = 0,
+    published_to: int = 0,
+    limit: int = 30,
+) -> List[Dict]:
+    """Повнотекстовий пошук по таблиці articles (FTS5, BM25) з дедупом історій."""
+    topics = [t.strip().lower() for t in (selected_topics or []) if t.strip()]
+    rows = storage.search_articles(
+        query,
+        topics=topics or None,
+        published_from=published_from,
+        published_to=published_to,
+        limit=limit,
+    )
+    return dedup_items([_to_item(r) for r in rows])
+
+
+# ---------- async-варіанти для FastAPI ----------
+# БД — через async_storage (потоки БД), мережа (ingestion вимкнено або
+# таблиця порожня) — через asyncio.to_thread; фільтрація — на event loop.
+
+async def load_snapshot_async(selected_topics: Optional[List[str]] = None) -> List[Dict]:
+    if not INGEST_ENABLED:
+        return await asyncio.to_thread(fetch_snapshot)
+
+    topics = [t.strip().lower() for t in (selected_topics or []) if t.strip()]
+    rows = await async_storage.get_articles(
+        topics=topics or None,
+        per_topic=ARTICLES_PER_TOPIC,
+        seen_since=int(time.time()) - ARTICLES_WINDOW_SEC,
+    )
+    if rows:
+        return [_to_item(r) for r in rows]
+    return await asyncio.to_thread(_warm_snapshot)
+
+
+async def get_news_async(
+    keywords: List[str],
+    limit_per_feed: int = 6,
+    ignore_keywords: bool = False,
+    selected_topics: Optional[List[str]] = None,
+) -> List[Dict]:
+    if not INGEST_ENABLED:
+        return await asyncio.to_thread(
+            fetch_news,
+            keywords=keywords,
+            limit_per_feed=limit_per_feed,
+            ignore_keywords=ignore_keywords,
+            selected_topics=selected_topics,
+        )
+
+    return filter_items(
+        await load_snapshot_async(selected_topics),
+        keywords=keywords,
+        limit_per_feed=limit_per_feed,
+        ignore_keywords=ignore_keywords,
+        selected_topics=selected_topics,
+    )
+
+
+async def search_news_async(
+    query: str,
+    selected_topics: Optional[List[str]] = None,
+    published_from: int = 0,
+    published_to: int = 0,
+    limit: int = 30,
+) -> List[Dict]:
+    topics = [t.strip().lower() for t in (selected_topics or []) if t.strip()]
+    rows = await async_storage.search_articles(
+        query,
+        topics=topics or None,
+        published_from=published_from,
+        published_to=published_to,
+        limit=limit,
+    )
+    return dedup_items([_to_item(r) for r in rows])
+
+
+def start_ingestor() -> Optional[ArticleIngestor]:
+    if not INGEST_ENABLED:
+        return None
+    ingestor = ArticleIngestor(INGEST_INTERVAL_SEC)
+    ingestor.start()
+    return ingestor
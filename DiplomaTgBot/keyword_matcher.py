@@ -0,0 +1,157 @@
+# keyword_matcher.py
+
+from __future__ import annotations
+
+import re
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from normalizer import WORD_RE, search_text_of
+
+
+class KeywordMatcher:
+    """
+    Спільний матчер для обʼєднання ключових слів усіх користувачів.
+    За один прохід по тексту статті повертає множину ключів, що збіглися,
+    з тією ж семантикою, що й news_fetcher._compile_keyword_patterns:
+      - слово з \\w-символів  -> ціле слово (перевірка по множині токенів);
+      - фраза з пробілом      -> підрядок;
+      - інше (c++, covid-19)  -> (?<!\\w)kw(?!\\w).
+    Фрази й "інші" ключі обʼєднані в одну альтернацію в lookahead, тож
+    finditer знаходить усі позиції, а ключі-префікси довшого збігу
+    дораховуються окремо.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._user_keywords: Dict[int, FrozenSet[str]] = {}
+        self._refcount: Dict[str, int] = {}
+        self._dirty = True
+
+        self._words: FrozenSet[str] = frozenset()
+        self._phrase_re: Optional[re.Pattern] = None
+        self._bounded_re: Optional[re.Pattern] = None
+        self._prefixes: Dict[str, List[str]] = {}
+        self._single: Dict[str, re.Pattern] = {}
+
+    # ---------- підписки ----------
+    def set_user_keywords(self, chat_id: int, keywords: Iterable[str]) -> None:
+        with self._lock:
+            self._set_locked(chat_id, keywords)
+
+    def reset(self, mapping: Dict[int, List[str]]) -> None:
+        with self._lock:
+            self._user_keywords = {}
+            self._refcount = {}
+            self._dirty = True
+            for chat_id, keywords in mapping.items():
+                self._set_locked(chat_id, keywords)
+
+    def _set_locked(self, chat_id: int, keywords: Iterable[str]) -> None:
+        new = frozenset(k.strip().lower() for k in keywords if k and k.strip())
+        old = self._user_keywords.get(chat_id, frozenset())
+        if new == old:
+            return
+
+        for kw in old - new:
+            self._refcount[kw] -= 1
+            if self._refcount[kw] <= 0:
+                del self._refcount[kw]
+                self._dirty = True
+        for kw in new - old:
+            if kw not in self._refcount:
+                self._dirty = True
+            self._refcount[kw] = self._refcount.get(kw, 0) + 1
+
+        if new:
+            self._user_keywords[chat_id] = new
+        else:
+            self._user_keywords.pop(chat_id, None)
+
+    def keywords_of(self, chat_id: int) -> FrozenSet[str]:
+        return self._user_keywords.get(chat_id, frozenset())
+
+    # ---------- компіляція ----------
+    def _rebuild_locked(self) -> None:
+        words: Set[str] = set()
+        phrases: List[str] = []
+        bounded: List[str] = []
+        for kw in self._refcount:
+            if " " in kw:
+                phrases.append(kw)
+            elif WORD_RE.fullmatch(kw):
+                words.add(kw)
+            else:
+                bounded.append(kw)
+
+        # довші — першими: на кожній позиції альтернація бере найдовший збіг
+        phrases.sort(key=len, reverse=True)
+        bounded.sort(key=len, reverse=True)
+
+        self._words = frozenset(words)
+        self._phrase_re = (
+            re.compile("(?=(" + "|".join(re.escape(p) for p in phrases) + "))", re.IGNORECASE)
+            if phrases else None
+        )
+        self._bounded_re = (
+            re.compile(r"(?=(?<!\w)(" + "|".join(re.escape(b) for b in bounded) + r")(?!\w))", re.IGNORECASE)
+            if bounded else None
+        )
+        self._single = {b: re.compile(rf"(?<!\w){re.escape(b)}(?!\w)", re.IGNORECASE) for b in bounded}
+
+        prefixes: Dict[str, List[str]] = {}
+        for group in (phrases, bounded):
+            for kw in group:
+                shorter = [o for o in group if o != kw and kw.startswith(o)]
+                if shorter:
+                    prefixes[kw] = shorter
+        self._prefixes = prefixes
+        self._dirty = False
+
+    # ---------- пошук ----------
+    def match(self, item: Dict) -> FrozenSet[str]:
+        """Усі ключі (з усіх підписок), які трапляються в статті."""
+        with self._lock:
+            if self._dirty:
+                self._rebuild_locked()
+            words, phrase_re, bounded_re = self._words, self._phrase_re, self._bounded_re
+            prefixes, single = self._prefixes, self._single
+
+        if not words and phrase_re is None and bounded_re is None:
+            return frozenset()
+
+        text = search_text_of(item)
+        hits: Set[str] = set()
+
+        if words:
+            tokens = item.get("tokens")
+            if tokens is None:
+                tokens = set(WORD_RE.findall(text))
+            hits.update(words & tokens)
+
+        if phrase_re is not None:
+            for m in phrase_re.finditer(text):
+                kw = m.group(1)
+                hits.add(kw)
+                # фраза-префікс на тій самій позиції теж збігається (підрядок)
+                hits.update(prefixes.get(kw, ()))
+
+        if bounded_re is not None:
+            for m in bounded_re.finditer(text):
+                kw = m.group(1)
+                hits.add(kw)
+                for shorter in prefixes.get(kw, ()):
+                    if single[shorter].match(text, m.start()):
+                        hits.add(shorter)
+
+        return frozenset(hits)
+
+    def match_all(self, items: List[Dict]) -> Dict[str, FrozenSet[str]]:
+        """Збіги для кожної статті знімка, за link (один прохід на статтю)."""
+        result: Dict[str, FrozenSet[str]] = {}
+        for item in items:
+            link = item.get("link", "")
+            if link not in result:
+                result[link] = self.match(item)
+        return result
+
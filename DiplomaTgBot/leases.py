@@ -0,0 +1,113 @@
+# leases.py
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from storage import storage
+
+logger = logging.getLogger(__name__)
+
+LeaseListener = Callable[[List[int], List[int]], None]
+WorkersListener = Callable[[int], None]
+
+
+class ShardLeases:
+    """
+    Оренда шардів автонадсилання через таблицю sender_leases: чат належить
+    шарду abs(chat_id) % shard_count, шард — одному процесу до expires_at.
+
+    Фоновий потік кожні ttl/3 с продовжує свої шарди, відмічає процес живим
+    і добирає вільні/прострочені шарди до справедливої частки
+    ceil(shard_count / живі воркери); зайві віддає, коли зʼявляється новий
+    воркер. Якщо процес помер, його шарди через ttl забирають інші.
+    """
+
+    def __init__(self, shard_count: int, ttl_sec: float, owner: Optional[str] = None) -> None:
+        self.shard_count = max(1, shard_count)
+        self.ttl_sec = max(3.0, ttl_sec)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._owned: Dict[int, float] = {}  # шард -> до коли наш
+        self._lock = threading.Lock()
+        self._listeners: List[LeaseListener] = []
+        self._worker_listeners: List[WorkersListener] = []
+        self.alive = 1  # живих воркерів за останнім поновленням (разом із цим)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        storage.init_sender_shards(self.shard_count)
+
+    def on_change(self, callback: LeaseListener) -> None:
+        """callback(отримані, втрачені) після кожного поновлення (списки можуть бути порожні)."""
+        self._listeners.append(callback)
+
+    def on_workers(self, callback: WorkersListener) -> None:
+        """callback(живих воркерів), коли їх кількість змінилась (і при першому поновленні)."""
+        self._worker_listeners.append(callback)
+
+    def shard_of(self, chat_id: int) -> int:
+        return abs(chat_id) % self.shard_count
+
+    def owned(self) -> List[int]:
+        with self._lock:
+            return sorted(self._owned)
+
+    def owns(self, chat_id: int, margin_sec: float = 0.0) -> bool:
+        """Чи наш шард чату і чи оренда не спливе раніше, ніж за margin_sec."""
+        with self._lock:
+            expires_at = self._owned.get(self.shard_of(chat_id))
+        return expires_at is not None and expires_at - margin_sec > time.time()
+
+    def tick(self) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_sec
+        alive = max(1, storage.heartbeat_sender(self.owner, now, now - self.ttl_sec))
+        workers_changed = alive != self.alive or self._thread is None
+        self.alive = alive
+        if workers_changed:
+            for callback in self._worker_listeners:
+                callback(alive)
+        kept = set(storage.renew_sender_leases(self.owner, expires_at, self.shard_count))
+
+        fair = math.ceil(self.shard_count / alive)
+        if len(kept) > fair:
+            extra = sorted(kept)[fair:]
+            storage.release_sender_leases(self.owner, extra)
+            kept -= set(extra)
+        kept |= set(storage.acquire_sender_leases(self.owner, now, expires_at, self.shard_count, fair - len(kept)))
+
+        with self._lock:
+            before = set(self._owned)
+            self._owned = {shard: expires_at for shard in kept}
+        gained = sorted(kept - before)
+        lost = sorted(before - kept)
+        if gained or lost:
+            logger.info("Шарди %s: отримано %s, втрачено %s, зараз %s", self.owner, gained, lost, sorted(kept))
+        for callback in self._listeners:
+            callback(gained, lost)
+
+    def start(self) -> None:
+        # перше поновлення синхронно — щоб одразу знати свої шарди
+        self.tick()
+        self._thread = threading.Thread(target=self._run, name="sender-leases", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Віддає всі шарди одразу, не чекаючи ttl (коректна зупинка процесу)."""
+        self._stop_event.set()
+        storage.remove_sender(self.owner)
+        with self._lock:
+            self._owned.clear()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.ttl_sec / 3):
+            try:
+                self.tick()
+            except Exception as exc:
+                logger.exception("Помилка поновлення оренди шардів: %s", exc)
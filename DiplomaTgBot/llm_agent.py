@@ -10,6 +10,7 @@ from config import (
     USE_LLM,
     CHAT_HISTORY_LIMIT,
 )
+from llm_cache import llm_cache
 
 def _trim_text(s: str, limit: int) -> str:
     s = (s or "").strip()
@@ -34,8 +35,11 @@ def chat_with_agent(message: str, history: List[Dict] | None = None) -> Dict:
       {
         "answer": "...",
         "model": "...",
-        "used_llm": true/false
+        "used_llm": true/false,
+        "cached": true/false
       }
+    Однакові запити (модель + усі повідомлення) повертаються з llm_cache
+    без виклику API.
     """
     msg = _trim_text(message, LLM_MAX_INPUT_CHARS)
     hist = _normalize_history(history or [])
@@ -45,6 +49,7 @@ def chat_with_agent(message: str, history: List[Dict] | None = None) -> Dict:
             "answer": "LLM вимкнено (USE_LLM=0).",
             "model": OPENAI_MODEL,
             "used_llm": False,
+            "cached": False,
         }
 
     if not OPENAI_API_KEY:
@@ -52,8 +57,23 @@ def chat_with_agent(message: str, history: List[Dict] | None = None) -> Dict:
             "answer": "Не задано OPENAI_API_KEY на сервері.",
             "model": OPENAI_MODEL,
             "used_llm": False,
+            "cached": False,
         }
 
+    messages = []
+    # системне повідомлення можна мінімальне, щоб не ламати логіку
+    messages.append({
+        "role": "system",
+        "content": "Ти AI-помічник новинного застосунку. Відповідай коротко і по суті українською.",
+    })
+    messages.extend(hist)
+    messages.append({"role": "user", "content": msg})
+
+    cache_key = llm_cache.request_key(OPENAI_MODEL, messages)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        return {"answer": cached, "model": OPENAI_MODEL, "used_llm": True, "cached": True}
+
     # максимально проста інтеграція через openai (новий клієнт)
     try:
         from openai import OpenAI
@@ -62,19 +82,11 @@ def chat_with_agent(message: str, history: List[Dict] | None = None) -> Dict:
             "answer": "Не встановлено бібліотеку openai у requirements.txt.",
             "model": OPENAI_MODEL,
             "used_llm": False,
+            "cached": False,
         }
 
     client = OpenAI(api_key=OPENAI_API_KEY)
 
-    messages = []
-    # системне повідомлення можна мінімальне, щоб не ламати логіку
-    messages.append({
-        "role": "system",
-        "content": "Ти AI-помічник новинного застосунку. Відповідай коротко і по суті українською.",
-    })
-    messages.extend(hist)
-    messages.append({"role": "user", "content": msg})
-
     try:
         resp = client.chat.completions.create(
             model=OPENAI_MODEL,
@@ -83,11 +95,13 @@ def chat_with_agent(message: str, history: List[Dict] | None = None) -> Dict:
         )
         answer = (resp.choices[0].message.content or "").strip()
         if not answer:
-            answer = "Порожня відповідь від моделі."
-        return {"answer": answer, "model": OPENAI_MODEL, "used_llm": True}
+            return {"answer": "Порожня відповідь від моделі.", "model": OPENAI_MODEL, "used_llm": True, "cached": False}
+        llm_cache.put(cache_key, answer)
+        return {"answer": answer, "model": OPENAI_MODEL, "used_llm": True, "cached": False}
     except Exception as e:
         return {
             "answer": f"Помилка виклику LLM: {type(e).__name__}: {e}",
             "model": OPENAI_MODEL,
             "used_llm": False,
+            "cached": False,
         }
@@ -0,0 +1,151 @@
+# llm_cache.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from storage import storage
+from dedup import canonical_url
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_TTL_SEC,
+    LLM_CACHE_MEMORY_SIZE,
+)
+
+
+def _digest(payload) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class LLMCache:
+    """
+    Кеш результатів LLM за вмістом запиту: однаковий (модель, промпт,
+    повідомлення) -> однаковий ключ -> відповідь без виклику API.
+
+    Два рівні: LRU у памʼяті процесу (мікросекунди) і таблиця llm_cache у
+    SQLite (спільна для бота, воркерів і веб-API, переживає перезапуск).
+    Записи живуть ttl_sec від створення на обох рівнях; розмір таблиці
+    обмежує обслуговування БД (prune_llm_cache, LRU за accessed_at).
+    Читання з БД нічого не пише: час доступу копиться в памʼяті і
+    записується пачкою (flush) — кожні _TOUCH_BATCH влучань і перед чисткою.
+    """
+
+    _TOUCH_BATCH = 256
+
+    def __init__(self, ttl_sec: int, memory_size: int, enabled: bool = True) -> None:
+        self.ttl_sec = ttl_sec
+        self.memory_size = max(0, memory_size)
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # ключ -> останній доступ, ще не записаний у БД
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    # ---------- ключі ----------
+    @staticmethod
+    def request_key(model: str, messages: List[Dict]) -> str:
+        """Ключ запиту до чату: модель + усі повідомлення (разом із системним)."""
+        return "chat:" + _digest([model, messages])
+
+    @staticmethod
+    def digest_key(model: str, keywords: List[str], items: List[Dict]) -> str:
+        """
+        Ключ LLM-дайджесту: модель + ключові слова + статті-кандидати. Стаття
+        — це її dedup_key (інша копія тієї ж історії дає той самий ключ) і
+        заголовок.
+        """
+        articles = [
+            [it.get("dedup_key") or canonical_url(it.get("link", "")), it.get("title", "")]
+            for it in items
+        ]
+        return "digest:" + _digest([model, sorted(k.lower() for k in keywords), articles])
+
+    # ---------- доступ ----------
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[1] > now - self.ttl_sec:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self._touched[key] = now
+                return cached[0]
+
+        row = storage.get_llm_cache(key, now - self.ttl_sec)
+        with self._lock:
+            if row is None:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+            value, created_at = row
+            self.db_hits += 1
+            self._touched[key] = now
+            # час створення — з БД, щоб у памʼяті запис не пережив свій TTL
+            self._remember(key, value, created_at)
+            flush = len(self._touched) >= self._TOUCH_BATCH
+        if flush:
+            self.flush()
+        return value
+
+    def flush(self) -> int:
+        """Записує накопичені часи доступу (для LRU-чистки) однією транзакцією."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            storage.touch_llm_cache(list(touched.items()))
+        return len(touched)
+
+    def put(self, key: str, value: str) -> None:
+        if not self.enabled or not value:
+            return
+        storage.put_llm_cache(key, value)
+        with self._lock:
+            self._remember(key, value, time.time())
+
+    def get_or_compute(self, key: str, compute: Callable[[], Optional[str]]) -> Optional[str]:
+        """compute() викликається лише при промаху; None (помилка) не кешується."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        # викликається під self._lock
+        if not self.memory_size:
+            return
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+llm_cache = LLMCache(LLM_CACHE_TTL_SEC, LLM_CACHE_MEMORY_SIZE, enabled=LLM_CACHE_ENABLED)
@@ -5,9 +5,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from config import setup_logging, TELEGRAM_TOKEN
+from config import setup_logging, TELEGRAM_TOKEN, AUTO_SENDER_IN_BOT
 from bot_instance import bot
 from auto_sender import start_auto_sender
+from ingestion import start_ingestor
+from maintenance import start_maintenance
 
 from handlers_start import handle_start
 from handlers_news import handle_news_command
@@ -32,7 +34,10 @@ def main() -> None:
     logger.info("Запуск бота…")
 
     register_handlers()
-    start_auto_sender()
+    start_ingestor()
+    start_maintenance()
+    if AUTO_SENDER_IN_BOT:
+        start_auto_sender()
 
     logger.info("Бот запущений. Очікування повідомлень…")
     bot.infinity_polling(timeout=30, long_polling_timeout=30)
@@ -0,0 +1,91 @@
+# maintenance.py
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from storage import storage
+from llm_cache import llm_cache
+from config import (
+    MAINTENANCE_INTERVAL_SEC,
+    SENT_NEWS_RETENTION_SEC,
+    SENT_NEWS_PRUNE_BATCH,
+    ARTICLES_WINDOW_SEC,
+    ARTICLES_RETENTION_DAYS,
+    CHAT_HISTORY_TRIM,
+    OUTBOX_RETENTION_SEC,
+    LLM_CACHE_TTL_SEC,
+    LLM_CACHE_MAX_ENTRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def run_maintenance_once() -> int:
+    # статті старші за ARTICLES_WINDOW_SEC у вибірку вже не потрапляють,
+    # тож коротше памʼятати надіслане не можна — інакше повтори
+    retention = max(SENT_NEWS_RETENTION_SEC, ARTICLES_WINDOW_SEC)
+    removed = storage.prune_sent_news(int(time.time()) - retention, batch_size=SENT_NEWS_PRUNE_BATCH)
+    if removed:
+        logger.info("sent_news: видалено %d застарілих записів", removed)
+
+    # не коротше за вікно вибірки — інакше знімок втратить актуальні статті
+    days = max(ARTICLES_RETENTION_DAYS, ARTICLES_WINDOW_SEC / 86400)
+    articles = storage.prune_articles(days, batch_size=SENT_NEWS_PRUNE_BATCH)
+    if articles:
+        logger.info("articles: видалено %d статей, старших за %.0f дн.", articles, days)
+    removed += articles
+
+    pruned = storage.prune_outbox(time.time() - OUTBOX_RETENTION_SEC, batch_size=SENT_NEWS_PRUNE_BATCH)
+    if pruned:
+        logger.info("outbox: видалено %d завершених записів", pruned)
+    removed += pruned
+
+    llm_cache.flush()  # свіжі часи доступу — до LRU-витіснення
+    evicted = storage.prune_llm_cache(time.time() - LLM_CACHE_TTL_SEC, LLM_CACHE_MAX_ENTRIES)
+    stats = llm_cache.stats()
+    logger.info(
+        "Кеш LLM: hit rate %.1f%% (памʼять %d, БД %d, промахи %d), видалено %d",
+        stats["hit_rate"] * 100,
+        stats["memory_hits"],
+        stats["db_hits"],
+        stats["misses"],
+        evicted,
+    )
+    removed += evicted
+
+    if CHAT_HISTORY_TRIM:
+        trimmed = storage.trim_chat_history(batch_size=SENT_NEWS_PRUNE_BATCH)
+        if trimmed:
+            logger.info("chat_history: видалено %d повідомлень поза лімітом", trimmed)
+        removed += trimmed
+    return removed
+
+
+class StorageMaintenance(threading.Thread):
+    """Фонове обслуговування БД: чистка sent_news і articles за вікном зберігання, завершених записів outbox, кешу LLM і chat_history після зміни ліміту."""
+
+    def __init__(self, interval_sec: int) -> None:
+        super().__init__(name="storage-maintenance", daemon=True)
+        self.interval_sec = max(60, interval_sec)
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        logger.info("Обслуговування БД запущене з інтервалом %s сек.", self.interval_sec)
+        while not self._stop_event.is_set():
+            try:
+                run_maintenance_once()
+            except Exception as exc:
+                logger.exception("Помилка обслуговування БД: %s", exc)
+            self._stop_event.wait(self.interval_sec)
+
+
+def start_maintenance() -> StorageMaintenance:
+    worker = StorageMaintenance(MAINTENANCE_INTERVAL_SEC)
+    worker.start()
+    return worker
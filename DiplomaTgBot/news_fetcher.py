@@ -2,25 +2,132 @@
 
 from __future__ import annotations
 
+import calendar
 import logging
 import re
+import threading
 import time
-import html as html_lib
-from typing import List, Dict, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from xml.etree.ElementTree import ParseError
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import requests
 import feedparser
 
+import http_client
+from rss_stream import iter_rss_entries
+from dedup import dedup_items
+from normalizer import WORD_RE, normalize_raw, search_text_of
 from config import (
     NEWS_SOURCES,
     REQUEST_TIMEOUT,
     MAX_ITEMS_TOTAL,
     MAX_FETCH_DURATION_SEC,
+    FETCH_MAX_WORKERS,
+    RSS_CHUNK_SIZE,
+    RSS_DRAIN_MAX_BYTES,
+    SOURCE_HEALTH_WINDOW,
+    SOURCE_BREAKER_THRESHOLD,
+    SOURCE_BREAKER_COOLDOWN_SEC,
+    SOURCE_TIMEOUT_MIN,
+    SOURCE_TIMEOUT_P95_FACTOR,
 )
 
 logger = logging.getLogger(__name__)
 
-TAG_RE = re.compile(r"<[^>]+>")
+# Спільний пул для паралельного збору RSS: обмежує кількість одночасних
+# запитів незалежно від того, скільки викликів fetch_news іде паралельно.
+_executor = ThreadPoolExecutor(max_workers=max(1, FETCH_MAX_WORKERS), thread_name_prefix="rss-fetch")
+
+# Кеш умовного GET: url -> {"etag", "last_modified", "entries"}
+_feed_cache: Dict[str, Dict] = {}
+_feed_cache_lock = threading.Lock()
+
+
+class _SourceHealth:
+    """
+    Ковзна статистика одного джерела: затримки, помилки і стан circuit breaker.
+    Після SOURCE_BREAKER_THRESHOLD помилок поспіль джерело пропускається на
+    SOURCE_BREAKER_COOLDOWN_SEC, потім пускаємо один пробний запит (half-open).
+    """
+
+    def __init__(self) -> None:
+        self.latencies: deque = deque(maxlen=SOURCE_HEALTH_WINDOW)
+        self.outcomes: deque = deque(maxlen=SOURCE_HEALTH_WINDOW)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.half_open = False
+        self.skipped = 0
+        self.last_error = ""
+
+    def allow(self, now: float) -> bool:
+        if self.open_until <= 0:
+            return True
+        if now < self.open_until or self.half_open:
+            self.skipped += 1
+            return False
+        self.half_open = True
+        return True
+
+    def timeout(self) -> float:
+        if len(self.latencies) < 5:
+            return REQUEST_TIMEOUT
+        ordered = sorted(self.latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(SOURCE_TIMEOUT_MIN, min(REQUEST_TIMEOUT, p95 * SOURCE_TIMEOUT_P95_FACTOR))
+
+    def record(self, ok: bool, latency: float, error: str = "") -> None:
+        self.outcomes.append(ok)
+        self.half_open = False
+        if ok:
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+            return
+
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.consecutive_failures >= SOURCE_BREAKER_THRESHOLD:
+            self.open_until = time.time() + SOURCE_BREAKER_COOLDOWN_SEC
+
+    def as_dict(self) -> Dict:
+        ordered = sorted(self.latencies)
+        errors = sum(1 for ok in self.outcomes if not ok)
+        return {
+            "state": "open" if self.open_until > time.time() else ("half_open" if self.half_open else "closed"),
+            "requests": len(self.outcomes),
+            "error_rate": round(errors / len(self.outcomes), 3) if self.outcomes else 0.0,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_p50_ms": round(ordered[len(ordered) // 2] * 1000) if ordered else None,
+            "latency_p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000) if ordered else None,
+            "timeout_sec": round(self.timeout(), 2),
+            "skipped": self.skipped,
+            "last_error": self.last_error,
+        }
+
+
+# Health по кожному url джерела
+_health: Dict[str, _SourceHealth] = {}
+_health_lock = threading.Lock()
+
+
+def _get_health(url: str) -> _SourceHealth:
+    h = _health.get(url)
+    if h is None:
+        h = _health.setdefault(url, _SourceHealth())
+    return h
+
+
+def get_sources_health() -> List[Dict]:
+    """Стан усіх джерел для API моніторингу."""
+    result: List[Dict] = []
+    with _health_lock:
+        for src in NEWS_SOURCES:
+            url = src.get("url", "")
+            h = _health.get(url)
+            stats = h.as_dict() if h else {"state": "closed", "requests": 0}
+            result.append({"key": src.get("key", ""), "topic": src.get("topic", ""), **stats})
+    return result
 
 
 def normalize_keywords(text: str) -> List[str]:
@@ -30,18 +137,11 @@ def normalize_keywords(text: str) -> List[str]:
     return [p.strip().lower() for p in parts if p.strip()]
 
 
-def _clean_text(s: str) -> str:
-    if not s:
-        return ""
-    s = TAG_RE.sub("", s)
-    s = html_lib.unescape(s)
-    s = s.replace("\xa0", " ")
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+KeywordPattern = Tuple[str, re.Pattern, bool]
 
 
-def _compile_keyword_patterns(keywords: List[str]) -> List[tuple[str, re.Pattern]]:
-    patterns: List[tuple[str, re.Pattern]] = []
+def _compile_keyword_patterns(keywords: List[str]) -> List[KeywordPattern]:
+    patterns: List[KeywordPattern] = []
     for kw in keywords:
         kw = kw.strip().lower()
         if not kw:
@@ -52,56 +152,183 @@ def _compile_keyword_patterns(keywords: List[str]) -> List[tuple[str, re.Pattern
         else:
             pat = re.compile(rf"(?<!\w){re.escape(kw)}(?!\w)", re.IGNORECASE)
 
-        patterns.append((kw, pat))
+        # Ключ з одних \w-символів збігається з (?<!\w)kw(?!\w) рівно тоді,
+        # коли він є серед токенів статті — перевіряємо множиною, без regex
+        is_word = bool(WORD_RE.fullmatch(kw))
+        patterns.append((kw, pat, is_word))
     return patterns
 
 
-def _match_keywords(item: Dict, patterns: List[tuple[str, re.Pattern]]) -> bool:
+def _match_keywords(item: Dict, patterns: List[KeywordPattern]) -> bool:
     if not patterns:
         return True
 
-    haystack = " ".join(
-        [
-            str(item.get("title", "")),
-            str(item.get("summary", "")),
-            str(item.get("content", "")),
-        ]
-    ).lower()
-
-    return any(p.search(haystack) for _, p in patterns)
-
-
-def _fetch_rss(url: str) -> Optional[feedparser.FeedParserDict]:
+    tokens = item.get("tokens")
+    haystack = None
+    for kw, pat, is_word in patterns:
+        if is_word and tokens is not None:
+            if kw in tokens:
+                return True
+            continue
+        if haystack is None:
+            haystack = search_text_of(item)
+        if pat.search(haystack):
+            return True
+    return False
+
+
+def iter_feed_entries(url: str) -> Iterator[feedparser.FeedParserDict]:
+    """
+    Потоково віддає записи RSS. Відповідь читається шматками і розбирається
+    інкрементально (rss_stream), тож якщо споживач зупинився після
+    limit_per_feed записів — решта документа не завантажується.
+
+    Умовний GET: надсилаємо If-None-Match / If-Modified-Since з попередньої
+    відповіді, і на 304 віддаємо вже розібрані записи без повторного розбору.
+    Кешуються лише повністю прочитані документи: якщо споживач зупинився
+    раніше, решта тіла дочитується (до RSS_DRAIN_MAX_BYTES) і розбирається
+    вже без віддачі — так і запис для 304 зʼявляється, і keep-alive
+    зʼєднання повертається в пул http_client, а не закривається.
+
+    Якщо швидкий парсер не впорався (некоректний XML, HTML-сутності тощо),
+    дочитуємо відповідь і розбираємо її feedparser-ом.
+
+    Успіх у health записується лише після того, як тіло дочитане: тайм-аут
+    посеред тіла або вихід за MAX_FETCH_DURATION_SEC — це помилка, тож
+    повільне джерело теж відкриває circuit breaker. Затримка — повний час
+    запиту, а не лише до заголовків.
+    """
     headers = {
-        "User-Agent": "Mozilla/5.0 (compatible; DiplomaNewsBot/1.0)",
         "Accept": "application/rss+xml,application/xml;q=0.9,*/*;q=0.8",
     }
+
+    with _health_lock:
+        health = _get_health(url)
+        if not health.allow(time.time()):
+            logger.info("RSS %s пропущено: circuit breaker відкритий.", url)
+            return
+        timeout = health.timeout()
+
+    with _feed_cache_lock:
+        cached = _feed_cache.get(url)
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    started = time.time()
+    deadline = started + MAX_FETCH_DURATION_SEC
     try:
-        resp = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        resp = http_client.get(url, headers=headers, timeout=timeout, stream=True)
+        if resp.status_code == 304 and cached:
+            # порожнє тіло, але дочитане — інакше close() рве keep-alive
+            resp.content
+            resp.close()
+            _record_fetch(health, started, "")
+            yield from cached["entries"]
+            return
+
         resp.raise_for_status()
-        return feedparser.parse(resp.content)
     except Exception as exc:
+        _record_fetch(health, started, f"{type(exc).__name__}: {exc}")
         logger.warning("Не вдалося отримати RSS %s: %s", url, exc)
+        return
+
+    entries: List[feedparser.FeedParserDict] = []
+    raw: List[bytes] = []
+    complete = False
+    error = ""
+
+    stream = _until(resp.iter_content(chunk_size=RSS_CHUNK_SIZE), deadline)
+
+    def chunks() -> Iterator[bytes]:
+        for chunk in stream:
+            raw.append(chunk)
+            yield chunk
+
+    try:
+        try:
+            for entry in iter_rss_entries(chunks()):
+                entries.append(entry)
+                yield entry
+        except ParseError:
+            raw.extend(stream)
+            feed = feedparser.parse(b"".join(raw))
+            fallback = list(getattr(feed, "entries", None) or [])
+            # те, що швидкий парсер уже віддав, не дублюємо
+            for entry in fallback[len(entries):]:
+                entries.append(entry)
+                yield entry
+        complete = True
+    except GeneratorExit:
+        # споживач узяв свій ліміт; віддавати більше не можна, але дочитати можна
+        rest = _drain_and_parse(stream, raw)
+        complete = rest is not None
+        if complete:
+            entries = rest
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        logger.warning("Не вдалося дочитати RSS %s: %s", url, exc)
+    finally:
+        resp.close()
+        _record_fetch(health, started, error)
+
+    if not complete:
+        return
+
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if etag or last_modified:
+        with _feed_cache_lock:
+            _feed_cache[url] = {"etag": etag, "last_modified": last_modified, "entries": entries}
+
+
+def _until(stream: Iterator[bytes], deadline: float) -> Iterator[bytes]:
+    """Обриває читання тіла, щойно минув дедлайн (тайм-аут requests — на кожне читання, не на все тіло)."""
+    for chunk in stream:
+        if time.time() > deadline:
+            raise TimeoutError("тіло RSS не дочитане до дедлайну")
+        yield chunk
+
+
+def _record_fetch(health: _SourceHealth, started: float, error: str) -> None:
+    latency = time.time() - started
+    if not error and latency > MAX_FETCH_DURATION_SEC:
+        error = f"перевищено MAX_FETCH_DURATION_SEC ({MAX_FETCH_DURATION_SEC} сек)"
+    with _health_lock:
+        health.record(not error, latency, error)
+
+
+def _drain_and_parse(stream: Iterator[bytes], raw: List[bytes]) -> Optional[List[feedparser.FeedParserDict]]:
+    """
+    Дочитує тіло до кінця, якщо воно не більше RSS_DRAIN_MAX_BYTES, і
+    розбирає документ цілком. None — документ завеликий або не розібрався
+    (тоді зʼєднання закривається, а відповідь не кешується).
+    """
+    size = sum(map(len, raw))
+    try:
+        for chunk in stream:
+            raw.append(chunk)
+            size += len(chunk)
+            if size > RSS_DRAIN_MAX_BYTES:
+                return None
+    except Exception:
         return None
 
+    data = b"".join(raw)
+    try:
+        return list(iter_rss_entries([data]))
+    except ParseError:
+        feed = feedparser.parse(data)
+        return list(getattr(feed, "entries", None) or [])
 
-def fetch_news(
-    keywords: List[str],
-    limit_per_feed: int = 6,
-    ignore_keywords: bool = False,
-    selected_topics: Optional[List[str]] = None,
-) -> List[Dict]:
-    start = time.time()
-    collected: List[Dict] = []
 
-    patterns = [] if ignore_keywords else _compile_keyword_patterns(keywords)
+def _pick_sources(selected_topics: Optional[List[str]]) -> List[Dict]:
     selected = {t.strip().lower() for t in (selected_topics or []) if t.strip()}
 
+    sources: List[Dict] = []
     for src in NEWS_SOURCES:
-        if time.time() - start > MAX_FETCH_DURATION_SEC:
-            logger.info("Досягнуто ліміт часу збору (%s сек).", MAX_FETCH_DURATION_SEC)
-            break
-
         if src.get("type") != "google_news_rss":
             continue
 
@@ -110,51 +337,186 @@ def fetch_news(
         if selected and src_key not in selected:
             continue
 
-        url = src.get("url")
-        topic = src.get("topic", "Тема")
-        query = src.get("query", "")
+        sources.append(src)
+    return sources
+
+
+def _iter_feed_items(src: Dict, entries: Iterable[feedparser.FeedParserDict]) -> Iterator[Dict]:
+    topic = src.get("topic", "Тема")
+    topic_key = (src.get("key") or "").strip().lower()
+    query = src.get("query", "")
+
+    for e in entries:
+        link = getattr(e, "link", "") or ""
+        title, summary, search_text, tokens = normalize_raw(
+            link,
+            getattr(e, "title", "") or "",
+            getattr(e, "summary", "") or "",
+        )
+        published_parsed = getattr(e, "published_parsed", None)
+
+        yield {
+            "source": "Google News",
+            "topic": topic,
+            "topic_key": topic_key,
+            "query": query,
+            "title": title,
+            "summary": summary,
+            "content": "",
+            "link": link,
+            "published": getattr(e, "published", "") or "",
+            "published_at": calendar.timegm(published_parsed) if published_parsed else 0,
+            "search_text": search_text,
+            "tokens": tokens,
+        }
+
+
+def _take_matching(
+    items: Iterable[Dict],
+    matches: Optional[Callable[[Dict], bool]],
+    limit_per_feed: int,
+) -> List[Dict]:
+    taken: List[Dict] = []
+    if limit_per_feed <= 0:
+        return taken
+    for item in items:
+        if matches is None or matches(item):
+            taken.append(item)
+            if len(taken) >= limit_per_feed:
+                break
+    return taken
 
-        feed = _fetch_rss(url)
-        if not feed or not getattr(feed, "entries", None):
-            continue
 
-        count = 0
-        for e in feed.entries:
-            if count >= limit_per_feed:
-                break
+def _keyword_predicate(keywords: List[str], ignore_keywords: bool) -> Optional[Callable[[Dict], bool]]:
+    if ignore_keywords:
+        return None
+    patterns = _compile_keyword_patterns(keywords)
+    if not patterns:
+        return None
+    return lambda item: _match_keywords(item, patterns)
 
-            title = _clean_text(getattr(e, "title", "") or "")
-            summary = _clean_text(getattr(e, "summary", "") or "")
-            link = getattr(e, "link", "") or ""
-
-            item = {
-                "source": "Google News",
-                "topic": topic,
-                "query": query,
-                "title": title,
-                "summary": summary,
-                "content": "",
-                "link": link,
-            }
-
-            if ignore_keywords or _match_keywords(item, patterns):
-                collected.append(item)
-                count += 1
-
-            if len(collected) >= MAX_ITEMS_TOTAL:
-                break
 
-        if len(collected) >= MAX_ITEMS_TOTAL:
+def assemble_items(per_source: List[List[Dict]]) -> List[Dict]:
+    collected: List[Dict] = []
+    for items in per_source:
+        collected.extend(items)
+    collected = collected[:MAX_ITEMS_TOTAL]
+
+    # Унікалізація: канонічний URL + схожі заголовки з різних тем
+    return dedup_items(collected)
+
+
+def _fetch_sequential(sources: List[Dict], collect, max_items: Optional[int]) -> List[List[Dict]]:
+    start = time.time()
+    results: List[List[Dict]] = []
+    total = 0
+
+    for src in sources:
+        if time.time() - start > MAX_FETCH_DURATION_SEC:
+            logger.info("Досягнуто ліміт часу збору (%s сек).", MAX_FETCH_DURATION_SEC)
+            break
+
+        items = collect(src)
+        results.append(items)
+        total += len(items)
+        if max_items is not None and total >= max_items:
             break
+    return results
+
+
+def _fetch_concurrent(sources: List[Dict], collect) -> List[List[Dict]]:
+    """
+    Усі джерела завантажуються паралельно під одним загальним дедлайном.
+    Те, що не встигло за MAX_FETCH_DURATION_SEC, відкидаємо, а результати
+    повертаємо у порядку NEWS_SOURCES — щоб вихід був детермінований.
+    """
+    futures = [_executor.submit(collect, src) for src in sources]
+    done, not_done = wait(futures, timeout=MAX_FETCH_DURATION_SEC)
+
+    if not_done:
+        logger.info(
+            "Досягнуто ліміт часу збору (%s сек), не встигли джерел: %d.",
+            MAX_FETCH_DURATION_SEC,
+            len(not_done),
+        )
+        for f in not_done:
+            f.cancel()
+
+    results: List[List[Dict]] = []
+    for f in futures:
+        if f not in done:
+            continue
+        try:
+            results.append(f.result())
+        except Exception as exc:
+            logger.warning("Помилка обробки RSS: %s", exc)
+    return results
+
+
+def _fetch_sources(sources: List[Dict], collect, concurrent: bool, max_items: Optional[int]) -> List[List[Dict]]:
+    if concurrent and FETCH_MAX_WORKERS > 1 and len(sources) > 1:
+        return _fetch_concurrent(sources, collect)
+    return _fetch_sequential(sources, collect, max_items)
+
+
+def fetch_news(
+    keywords: List[str],
+    limit_per_feed: int = 6,
+    ignore_keywords: bool = False,
+    selected_topics: Optional[List[str]] = None,
+    concurrent: bool = True,
+) -> List[Dict]:
+    matches = _keyword_predicate(keywords, ignore_keywords)
+    sources = _pick_sources(selected_topics)
+
+    def collect(src: Dict) -> List[Dict]:
+        entries = iter_feed_entries(src.get("url"))
+        try:
+            return _take_matching(_iter_feed_items(src, entries), matches, limit_per_feed)
+        finally:
+            # ліміт набрано — закриваємо потік, решта RSS не читається
+            entries.close()
+
+    per_source = _fetch_sources(sources, collect, concurrent, MAX_ITEMS_TOTAL)
+    return assemble_items(per_source)
+
+
+def fetch_snapshot(concurrent: bool = True) -> List[Dict]:
+    """
+    Знімок усіх записів усіх джерел без фільтрації — один збір на цикл,
+    який далі фільтрується в памʼяті під кожного користувача (filter_items).
+    """
+    sources = _pick_sources(None)
+
+    def collect(src: Dict) -> List[Dict]:
+        return list(_iter_feed_items(src, iter_feed_entries(src.get("url"))))
+
+    snapshot: List[Dict] = []
+    for items in _fetch_sources(sources, collect, concurrent, None):
+        snapshot.extend(items)
+    return snapshot
+
+
+def filter_items(
+    items: List[Dict],
+    keywords: List[str],
+    limit_per_feed: int = 6,
+    ignore_keywords: bool = False,
+    selected_topics: Optional[List[str]] = None,
+) -> List[Dict]:
+    """
+    Те саме, що fetch_news, але над уже зібраними записами (знімком):
+    фільтр тем, ключові слова, ліміт на джерело, MAX_ITEMS_TOTAL і дедуп.
+    """
+    matches = _keyword_predicate(keywords, ignore_keywords)
+    selected = {t.strip().lower() for t in (selected_topics or []) if t.strip()}
 
-    # Унікалізація по link
-    seen = set()
-    unique: List[Dict] = []
-    for item in collected:
-        link = item.get("link", "")
-        if link and link in seen:
+    groups: Dict[str, List[Dict]] = {}
+    for item in items:
+        key = item.get("topic_key", "")
+        if selected and key not in selected:
             continue
-        seen.add(link)
-        unique.append(item)
+        groups.setdefault(key, []).append(item)
 
-    return unique
+    per_source = [_take_matching(g, matches, limit_per_feed) for g in groups.values()]
+    return assemble_items(per_source)
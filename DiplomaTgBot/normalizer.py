@@ -0,0 +1,106 @@
+# normalizer.py
+
+from __future__ import annotations
+
+import html as html_lib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Tuple
+
+from config import NORMALIZE_CACHE_SIZE
+
+TAG_RE = re.compile(r"<[^>]+>")
+WS_RE = re.compile(r"\s+")
+WORD_RE = re.compile(r"\w+")
+
+# (title, summary, search_text, tokens)
+Normalized = Tuple[str, str, str, FrozenSet[str]]
+
+
+def clean_text(s: str) -> str:
+    if not s:
+        return ""
+    s = TAG_RE.sub("", s)
+    s = html_lib.unescape(s)
+    s = s.replace("\xa0", " ")
+    s = WS_RE.sub(" ", s).strip()
+    return s
+
+
+def _search_fields(title: str, summary: str) -> Tuple[str, FrozenSet[str]]:
+    search_text = f"{title} {summary}".lower()
+    return search_text, frozenset(WORD_RE.findall(search_text))
+
+
+class _NormalizeCache:
+    """
+    LRU: link -> (сирі title/summary, нормалізовані поля). Одна й та сама
+    стаття приходить у кожному циклі і в кількох темах — чистимо її один раз.
+    Якщо сирий текст за тим самим link змінився, рахуємо заново.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[str, str, Normalized]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, link: str, raw_title: str, raw_summary: str):
+        with self._lock:
+            hit = self._data.get(link)
+            if hit is None or hit[0] != raw_title or hit[1] != raw_summary:
+                return None
+            self._data.move_to_end(link)
+            return hit[2]
+
+    def put(self, link: str, raw_title: str, raw_summary: str, value: Normalized) -> None:
+        with self._lock:
+            self._data[link] = (raw_title, raw_summary, value)
+            self._data.move_to_end(link)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+
+_raw_cache = _NormalizeCache(NORMALIZE_CACHE_SIZE)
+_clean_cache = _NormalizeCache(NORMALIZE_CACHE_SIZE)
+
+
+def normalize_raw(link: str, raw_title: str, raw_summary: str) -> Normalized:
+    """Сирі поля з RSS (HTML, сутності) -> чистий текст + поля для пошуку."""
+    if link:
+        cached = _raw_cache.get(link, raw_title, raw_summary)
+        if cached is not None:
+            return cached
+
+    title = clean_text(raw_title)
+    summary = clean_text(raw_summary)
+    value = (title, summary, *_search_fields(title, summary))
+    if link:
+        _raw_cache.put(link, raw_title, raw_summary, value)
+    return value
+
+
+def normalize_clean(link: str, title: str, summary: str) -> Normalized:
+    """Уже очищені поля (наприклад, з таблиці articles) -> поля для пошуку."""
+    if link:
+        cached = _clean_cache.get(link, title, summary)
+        if cached is not None:
+            return cached
+
+    value = (title, summary, *_search_fields(title, summary))
+    if link:
+        _clean_cache.put(link, title, summary, value)
+    return value
+
+
+def search_text_of(item: Dict) -> str:
+    text = item.get("search_text")
+    if text is not None:
+        return text
+    return " ".join(
+        [
+            str(item.get("title", "")),
+            str(item.get("summary", "")),
+            str(item.get("content", "")),
+        ]
+    ).lower()
@@ -0,0 +1,128 @@
+# outbox.py
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from storage import storage
+from delivery import DeliveryPool
+from config import (
+    OUTBOX_POLL_SEC,
+    OUTBOX_BATCH,
+    OUTBOX_CLAIM_SEC,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MAX_IN_FLIGHT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxSender(threading.Thread):
+    """
+    Надсилає частини дайджестів з таблиці outbox через пул доставки.
+
+    Рядок забирається (claim) перед відправкою і позначається 'sent' лише
+    після відповіді Telegram, тож падіння процесу не губить дайджест: після
+    OUTBOX_CLAIM_SEC рядок знову доступний. Ціна — доставка "щонайменше
+    раз": якщо процес упав між send_message і complete_outbox, частину
+    буде надіслано повторно.
+
+    Забирається не більше, ніж пул доставки встигає відправити (max_in_flight
+    частин у його черзі), а claim продовжується в момент відправки — тож
+    рядок не прострочується, поки чекає в памʼяті, і не йде двічі.
+    """
+
+    def __init__(
+        self,
+        delivery: DeliveryPool,
+        poll_sec: float = 2.0,
+        batch: int = 200,
+        claim_sec: int = 300,
+        max_attempts: int = 5,
+        max_in_flight: int = 50,
+    ) -> None:
+        super().__init__(name="outbox-sender", daemon=True)
+        self.delivery = delivery
+        self.poll_sec = max(0.1, poll_sec)
+        self.batch = max(1, batch)
+        self.claim_sec = max(1, claim_sec)
+        self.max_attempts = max(1, max_attempts)
+        self.max_in_flight = max(1, max_in_flight)
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self) -> None:
+        """Нові рядки в outbox — не чекати наступного опитування."""
+        self._wake_event.set()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def run(self) -> None:
+        logger.info("Outbox: надсилання запущене, опитування кожні %.1f с", self.poll_sec)
+        while not self._stop_event.is_set():
+            try:
+                self.drain_once()
+            except Exception as exc:
+                logger.exception("Помилка надсилання з outbox: %s", exc)
+            self._wake_event.wait(self.poll_sec)
+            self._wake_event.clear()
+
+    def drain_once(self) -> int:
+        room = self.max_in_flight - self.delivery.stats()["pending"]
+        if room <= 0:
+            return 0  # пул ще не встиг; наступне забирання — після on_done
+        rows = storage.claim_outbox(time.time(), self.claim_sec, min(self.batch, room))
+        for row in rows:
+            kwargs: Dict[str, object] = {"disable_web_page_preview": True}
+            if row["parse_mode"]:
+                kwargs["parse_mode"] = row["parse_mode"]
+            self.delivery.submit(
+                row["chat_id"],
+                [row["text"]],
+                on_done=self._done_callback(row),
+                on_send=self._send_callback(row),
+                **kwargs,
+            )
+        return len(rows)
+
+    def _send_callback(self, row: Dict):
+        def on_send() -> bool:
+            return storage.touch_outbox(row["id"], row["attempts"], time.time() + self.claim_sec)
+
+        return on_send
+
+    def _done_callback(self, row: Dict):
+        def on_done(ok: bool, error: Optional[str], permanent: bool) -> None:
+            if ok:
+                storage.complete_outbox(row["id"])
+                # наступна частина цього чату вже може йти
+                self._wake_event.set()
+                return
+
+            if permanent or row["attempts"] >= self.max_attempts:
+                # 400/403 (заблоковано, чат не існує) — повтори лише палять ліміт
+                logger.warning("Outbox: частину %s для чату %s не надіслано: %s", row["id"], row["chat_id"], error)
+                storage.fail_outbox(row["id"], error or "", None)
+                self._wake_event.set()
+            else:
+                # пул уже робив короткі повтори; тут — довший backoff між спробами
+                retry_at = time.time() + min(3600, 30 * 2 ** (row["attempts"] - 1))
+                storage.fail_outbox(row["id"], error or "", retry_at)
+
+        return on_done
+
+
+def create_outbox_sender(delivery: DeliveryPool) -> OutboxSender:
+    return OutboxSender(
+        delivery,
+        poll_sec=OUTBOX_POLL_SEC,
+        batch=OUTBOX_BATCH,
+        claim_sec=OUTBOX_CLAIM_SEC,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+        max_in_flight=OUTBOX_MAX_IN_FLIGHT,
+    )
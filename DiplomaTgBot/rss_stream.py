@@ -0,0 +1,91 @@
+# rss_stream.py
+
+from __future__ import annotations
+
+import time
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator, Optional
+from xml.etree.ElementTree import XMLPullParser
+
+from feedparser import FeedParserDict
+
+
+def _local(tag: str) -> str:
+    # "{http://www.w3.org/2005/Atom}entry" -> "entry"
+    if "}" in tag:
+        return tag.rsplit("}", 1)[1]
+    return tag
+
+
+def _parse_date(value: str) -> Optional[time.struct_time]:
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is not None:
+        return time.gmtime(dt.timestamp())
+    return dt.timetuple()
+
+
+def _entry_from_element(elem) -> FeedParserDict:
+    entry = FeedParserDict()
+    links = []
+
+    for child in elem:
+        name = _local(child.tag)
+        text = (child.text or "").strip()
+
+        if name == "title":
+            entry["title"] = text
+        elif name == "link":
+            # RSS: <link>url</link>, Atom: <link href="url" rel="alternate"/>
+            href = child.get("href") or text
+            if href:
+                links.append({"rel": child.get("rel", "alternate"), "href": href})
+                if "link" not in entry and child.get("rel", "alternate") == "alternate":
+                    entry["link"] = href
+        elif name in ("description", "summary"):
+            entry["summary"] = text
+        elif name == "content" and "summary" not in entry:
+            entry["summary"] = text
+        elif name in ("pubDate", "published", "updated") and "published" not in entry:
+            entry["published"] = text
+        elif name in ("guid", "id"):
+            entry["id"] = text
+        elif name == "source":
+            entry["source"] = FeedParserDict(href=child.get("url", ""), title=text)
+
+    entry["links"] = links
+    published_parsed = _parse_date(entry.get("published", ""))
+    if published_parsed:
+        entry["published_parsed"] = published_parsed
+    return entry
+
+
+def iter_rss_entries(chunks: Iterable[bytes]) -> Iterator[FeedParserDict]:
+    """
+    Інкрементальний розбір RSS/Atom: записи віддаються по одному, щойно
+    закрито <item>/<entry>, тож споживач може зупинитися після ліміту і
+    решта документа не читається й не розбирається.
+
+    Формат записів сумісний з feedparser (title/link/summary/published/id).
+    На некоректному XML кидає xml.etree.ElementTree.ParseError — тоді треба
+    fallback на feedparser.
+    """
+    parser = XMLPullParser(events=("end",))
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            if _local(elem.tag) in ("item", "entry"):
+                yield _entry_from_element(elem)
+                elem.clear()
+
+    parser.close()
+    for _, elem in parser.read_events():
+        if _local(elem.tag) in ("item", "entry"):
+            yield _entry_from_element(elem)
+            elem.clear()
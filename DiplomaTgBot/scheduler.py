@@ -0,0 +1,87 @@
+# scheduler.py
+
+from __future__ import annotations
+
+import heapq
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class DueScheduler:
+    """
+    Min-heap строків автонадсилання: (next_due_at, chat_id). Застарілі
+    записи купи (після перепланування) не видаляються, а пропускаються при
+    виборі — актуальний строк чату лежить у self._due.
+
+    Строк рахується від запланованого, а не від фактичного часу обробки,
+    тож повільна партія не зсуває розклад решти; до строку додається
+    випадковий jitter, щоб чати з однаковим інтервалом не збігались.
+    """
+
+    def __init__(self, jitter_sec: float = 0.0) -> None:
+        self.jitter_sec = max(0.0, jitter_sec)
+        self._heap: List[Tuple[float, int]] = []
+        self._due: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def jitter(self, interval_sec: float) -> float:
+        # симетричний (без накопиченого дрейфу) і не більше 10% інтервалу
+        spread = min(self.jitter_sec, interval_sec * 0.1)
+        return random.uniform(-spread, spread)
+
+    def schedule(self, chat_id: int, due_at: float) -> None:
+        with self._lock:
+            self._due[chat_id] = due_at
+            heapq.heappush(self._heap, (due_at, chat_id))
+        self._changed.set()
+
+    def remove(self, chat_id: int) -> None:
+        with self._lock:
+            self._due.pop(chat_id, None)
+
+    def remove_where(self, predicate: Callable[[int], bool]) -> None:
+        with self._lock:
+            for chat_id in [c for c in self._due if predicate(c)]:
+                del self._due[chat_id]
+
+    def due_of(self, chat_id: int) -> Optional[float]:
+        with self._lock:
+            return self._due.get(chat_id)
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            self._drop_stale_locked()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float, max_batch: int) -> List[Tuple[int, float]]:
+        """До max_batch чатів, чий строк настав: [(chat_id, запланований строк)]."""
+        batch: List[Tuple[int, float]] = []
+        with self._lock:
+            while self._heap and len(batch) < max_batch:
+                self._drop_stale_locked()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                due_at, chat_id = heapq.heappop(self._heap)
+                del self._due[chat_id]
+                batch.append((chat_id, due_at))
+        return batch
+
+    def wait(self, timeout: Optional[float]) -> None:
+        """Спить до timeout або до появи нового/ближчого строку."""
+        self._changed.wait(timeout)
+        self._changed.clear()
+
+    def wake(self) -> None:
+        self._changed.set()
+
+    def _drop_stale_locked(self) -> None:
+        while self._heap:
+            due_at, chat_id = self._heap[0]
+            if self._due.get(chat_id) == due_at:
+                return
+            heapq.heappop(self._heap)
@@ -0,0 +1,40 @@
+# sender_worker.py
+#
+# Окремий процес автонадсилання. Скільки завгодно таких процесів (разом із
+# ботом або без нього, AUTO_SENDER_IN_BOT=0) ділять чати через оренду
+# шардів у БД — кожен дайджест іде один раз.
+#
+# Запуск з каталогу DiplomaTgBot:
+#   SENDER_SHARDS=16 python sender_worker.py
+
+import logging
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import setup_logging, TELEGRAM_TOKEN, SENDER_SHARDS
+from auto_sender import start_auto_sender
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    setup_logging()
+
+    if not TELEGRAM_TOKEN:
+        raise RuntimeError("TELEGRAM_TOKEN не заданий.")
+    if SENDER_SHARDS <= 0:
+        raise RuntimeError("Для окремих відправників потрібен SENDER_SHARDS > 0.")
+
+    sender = start_auto_sender()
+    logger.info("Воркер автонадсилання запущений (%s), шардів: %d", sender.leases.owner, SENDER_SHARDS)
+    try:
+        while sender.is_alive():
+            sender.join(1)
+    except KeyboardInterrupt:
+        logger.info("Зупинка воркера, звільняємо шарди…")
+        sender.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# sent_cache.py
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+
+
+class SentLinkCache:
+    """
+    Памʼять перед sent_news: для кожного чату — LRU хешів посилань, про які
+    точно відомо, що вони вже надіслані. Влучання означає «вже було» і
+    обходиться без SQL; промах нічого не гарантує — тоді питаємо БД.
+    Обмежена і кількість хешів на чат, і кількість чатів (LRU по чатах).
+    """
+
+    def __init__(self, per_chat: int, max_chats: int) -> None:
+        self.per_chat = per_chat
+        self.max_chats = max_chats
+        self._chats: "OrderedDict[int, OrderedDict[int, None]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def split(self, keys: Iterable[Tuple[int, int]]) -> Tuple[set, list]:
+        """(chat_id, link_hash) -> (відомі як надіслані, невідомі)."""
+        known = set()
+        unknown = []
+        with self._lock:
+            for chat_id, h in keys:
+                seen = self._chats.get(chat_id)
+                if seen is not None and h in seen:
+                    seen.move_to_end(h)
+                    known.add((chat_id, h))
+                else:
+                    unknown.append((chat_id, h))
+            self.hits += len(known)
+            self.misses += len(unknown)
+        return known, unknown
+
+    def add(self, keys: Iterable[Tuple[int, int]]) -> None:
+        with self._lock:
+            for chat_id, h in keys:
+                seen = self._chats.get(chat_id)
+                if seen is None:
+                    seen = self._chats[chat_id] = OrderedDict()
+                    while len(self._chats) > self.max_chats:
+                        self._chats.popitem(last=False)
+                else:
+                    self._chats.move_to_end(chat_id)
+                seen[h] = None
+                seen.move_to_end(h)
+                while len(seen) > self.per_chat:
+                    seen.popitem(last=False)
+
+    def forget_chat(self, chat_id: int) -> None:
+        with self._lock:
+            self._chats.pop(chat_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._chats.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "chats": len(self._chats),
+                "links": sum(len(s) for s in self._chats.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
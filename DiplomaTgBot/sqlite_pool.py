@@ -0,0 +1,93 @@
+# sqlite_pool.py
+
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
+
+class ConnectionPool:
+    """
+    Потокобезпечний пул постійних зʼєднань SQLite. Кожне зʼєднання одразу
+    налаштоване: WAL (читачі не блокують писача), synchronous=NORMAL,
+    mmap, кеш сторінок, busy_timeout; підготовлені запити перевикористовує
+    кеш statement-ів самого sqlite3 (cached_statements).
+
+    connection() видає зʼєднання на час блоку with: при успіху незакомічена
+    транзакція комітиться, при винятку — відкочується (як with sqlite3.connect).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 8,
+        busy_timeout_ms: int = 5000,
+        cache_size_kb: int = 16384,
+        mmap_size: int = 64 * 1024 * 1024,
+        cached_statements: int = 256,
+    ) -> None:
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        con.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        con.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        con.execute("PRAGMA temp_store=MEMORY")
+        return con
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                con = self._open()
+                self._all.append(con)
+                return con
+
+        # усі зʼєднання зайняті — чекаємо, поки котресь повернуть
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        con = self._acquire()
+        try:
+            yield con
+        except BaseException:
+            con.rollback()
+            raise
+        else:
+            if con.in_transaction:
+                con.commit()
+        finally:
+            self._idle.put(con)
+
+    def close(self) -> None:
+        with self._lock:
+            for con in self._all:
+                con.close()
+            self._all.clear()
+        while not self._idle.empty():
+            self._idle.get_nowait()
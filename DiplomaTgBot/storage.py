@@ -1,19 +1,82 @@
 # storage.py
 
+import hashlib
+import re
 import sqlite3
-from typing import List, Dict, Tuple
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable, ContextManager, List, Dict, Optional, Tuple
 
-from config import DB_PATH, CHAT_HISTORY_LIMIT, AUTO_NEWS_INTERVAL_SEC
+from config import (
+    DB_PATH,
+    DB_POOL_SIZE,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE,
+    DB_CACHED_STATEMENTS,
+    CHAT_HISTORY_LIMIT,
+    AUTO_NEWS_INTERVAL_SEC,
+    SENT_CACHE_PER_CHAT,
+    SENT_CACHE_MAX_CHATS,
+    PROFILE_CACHE_SIZE,
+)
+from dedup import item_hash, link_hash
+from sent_cache import SentLinkCache
+from sqlite_pool import ConnectionPool
+
+# INSERT ... RETURNING з'явився в SQLite 3.35
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class UserProfile:
+    """Налаштування користувача одним обʼєктом (рядок users, уже розібраний)."""
+
+    chat_id: int
+    keywords: Tuple[str, ...] = ()
+    topics: Tuple[str, ...] = ()
+    input_state: str = ""
+    auto_interval_sec: int = AUTO_NEWS_INTERVAL_SEC
+
+
+def _split_csv(value: Optional[str]) -> Tuple[str, ...]:
+    return tuple(v.strip() for v in (value or "").split(",") if v.strip())
 
 
 class Storage:
     def __init__(self, db_path: str) -> None:
         self.db_path = db_path
+        self._pool = ConnectionPool(
+            db_path,
+            size=DB_POOL_SIZE,
+            busy_timeout_ms=DB_BUSY_TIMEOUT_MS,
+            cache_size_kb=DB_CACHE_SIZE_KB,
+            mmap_size=DB_MMAP_SIZE,
+            cached_statements=DB_CACHED_STATEMENTS,
+        )
+        # підписники на зміну підписок користувача (новий користувач, ключі, теми)
+        self._subscription_listeners: List[Callable[[int, int], None]] = []
+        # підписники на зміну розкладу автонадсилання (новий користувач, інтервал)
+        self._schedule_listeners: List[Callable[[int], None]] = []
         self._init_db()
         self._ensure_columns()
+        self._migrate_subscriptions()
+        self._migrate_sent_news()
+        self._migrate_chat_history()
+        self._sent_cache = SentLinkCache(SENT_CACHE_PER_CHAT, SENT_CACHE_MAX_CHATS)
+        # users.sent_generation, з яким узгоджений кеш (див. sync_sent_cache)
+        self._sent_generations: Dict[int, int] = {}
+        # write-through кеш профілів: сетери оновлюють і БД, і кеш
+        self._profiles: "OrderedDict[int, UserProfile]" = OrderedDict()
+        self._profiles_lock = threading.Lock()
+        self._warm_sent_cache()
+        self._fts = self._init_fts()
 
-    def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.db_path)
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        # зʼєднання з пулу на час блоку with (WAL, спільні налаштування)
+        return self._pool.connection()
 
     def _init_db(self) -> None:
         with self._connect() as con:
@@ -26,7 +89,9 @@ class Storage:
                     keywords TEXT DEFAULT '',
                     input_state TEXT DEFAULT '',
                     topics TEXT DEFAULT '',
-                    auto_interval_sec INTEGER DEFAULT 0
+                    auto_interval_sec INTEGER DEFAULT 0,
+                    next_due_at INTEGER DEFAULT 0,
+                    sent_generation INTEGER DEFAULT 0
                 )
                 """
             )
@@ -34,25 +99,135 @@ class Storage:
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS sent_news (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     chat_id INTEGER NOT NULL,
-                    link TEXT NOT NULL,
-                    UNIQUE(chat_id, link)
-                )
+                    link_hash INTEGER NOT NULL,
+                    sent_at INTEGER NOT NULL,
+                    PRIMARY KEY (chat_id, link_hash)
+                ) WITHOUT ROWID
                 """
             )
 
             cur.execute(
                 """
                 CREATE TABLE IF NOT EXISTS chat_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
                     chat_id INTEGER NOT NULL,
+                    slot INTEGER NOT NULL,
+                    seq INTEGER NOT NULL,
                     role TEXT NOT NULL,
                     content TEXT NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (chat_id, slot)
+                )
+                """
+            )
+
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    link TEXT NOT NULL,
+                    topic_key TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    summary TEXT DEFAULT '',
+                    published_at INTEGER DEFAULT 0,
+                    first_seen_at INTEGER NOT NULL,
+                    UNIQUE(link, topic_key)
+                )
+                """
+            )
+            cur.execute(
+                "CREATE INDEX IF NOT EXISTS idx_articles_topic_published ON articles (topic_key, published_at DESC)"
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_articles_first_seen ON articles (first_seen_at)")
+
+            # Нормалізовані підписки (дублюють users.keywords / users.topics)
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_keywords (
+                    chat_id INTEGER NOT NULL,
+                    keyword TEXT NOT NULL,
+                    PRIMARY KEY (chat_id, keyword)
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_user_keywords_keyword ON user_keywords (keyword)")
+
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_topics (
+                    chat_id INTEGER NOT NULL,
+                    topic_key TEXT NOT NULL,
+                    PRIMARY KEY (chat_id, topic_key)
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_user_topics_topic ON user_topics (topic_key)")
+
+            # Службові значення: версії, прапорці міграцій
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )
+                """
+            )
+
+            # outbox: частини дайджестів до надсилання (надсилає OutboxSender)
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id INTEGER NOT NULL,
+                    digest_key TEXT NOT NULL,
+                    part INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    parse_mode TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL DEFAULT 0,
+                    claimed_until REAL NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL,
+                    UNIQUE(digest_key, part)
                 )
                 """
             )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, next_attempt_at)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_chat ON outbox (chat_id, id)")
+
+            # оренда шардів автонадсилання між процесами (SENDER_SHARDS > 0)
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sender_leases (
+                    shard INTEGER PRIMARY KEY,
+                    owner TEXT,
+                    expires_at REAL NOT NULL DEFAULT 0
+                )
+                """
+            )
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sender_workers (
+                    owner TEXT PRIMARY KEY,
+                    heartbeat_at REAL NOT NULL
+                )
+                """
+            )
+
+            # кеш відповідей LLM: ключ — хеш (модель, промпт, повідомлення) або статті
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
 
             con.commit()
 
@@ -61,10 +236,19 @@ class Storage:
         Міграція схеми без видалення bot_data.sqlite3.
         Додає відсутні колонки до users.
         """
+        wanted = {"auto_interval_sec", "input_state", "topics", "keywords", "next_due_at", "sent_generation"}
         with self._connect() as con:
             cur = con.cursor()
             cur.execute("PRAGMA table_info(users)")
             cols = {row[1] for row in cur.fetchall()}
+            if wanted <= cols:
+                return
+
+            # як і в міграціях нижче: ще раз під блокуванням запису, бо інший
+            # процес міг додати колонки, поки ми чекали
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("PRAGMA table_info(users)")
+            cols = {row[1] for row in cur.fetchall()}
 
             if "auto_interval_sec" not in cols:
                 cur.execute("ALTER TABLE users ADD COLUMN auto_interval_sec INTEGER DEFAULT 0")
@@ -74,112 +258,584 @@ class Storage:
                 cur.execute("ALTER TABLE users ADD COLUMN topics TEXT DEFAULT ''")
             if "keywords" not in cols:
                 cur.execute("ALTER TABLE users ADD COLUMN keywords TEXT DEFAULT ''")
+            if "next_due_at" not in cols:
+                cur.execute("ALTER TABLE users ADD COLUMN next_due_at INTEGER DEFAULT 0")
+            if "sent_generation" not in cols:
+                cur.execute("ALTER TABLE users ADD COLUMN sent_generation INTEGER DEFAULT 0")
 
             con.commit()
 
-    def add_user_if_not_exists(self, chat_id: int) -> None:
+    def _init_fts(self) -> bool:
+        """
+        Повнотекстовий індекс FTS5 над articles (external content: текст
+        лежить в articles, індекс синхронізують тригери). Якщо SQLite зібраний
+        без FTS5 — повертаємо False, і пошук іде через LIKE.
+        """
         with self._connect() as con:
             cur = con.cursor()
+            cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'")
+            exists = cur.fetchone() is not None
+            try:
+                cur.execute(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                        title, summary,
+                        content='articles', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                    """
+                )
+            except sqlite3.OperationalError:
+                return False
+
             cur.execute(
-                "INSERT OR IGNORE INTO users (chat_id, keywords, input_state, topics, auto_interval_sec) VALUES (?, ?, ?, ?, ?)",
-                (chat_id, "", "", "", AUTO_NEWS_INTERVAL_SEC),
+                """
+                CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END
+                """
             )
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, title, summary)
+                    VALUES ('delete', old.id, old.title, old.summary);
+                END
+                """
+            )
+            cur.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, summary ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, title, summary)
+                    VALUES ('delete', old.id, old.title, old.summary);
+                    INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+                END
+                """
+            )
+            if not exists:
+                # індекс щойно створено над уже наявними статтями
+                cur.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
             con.commit()
+        return True
 
-    # ---------- keywords ----------
-    def set_keywords(self, chat_id: int, keywords: List[str]) -> None:
-        normalized = [k.strip().lower() for k in keywords if k.strip()]
-        keywords_str = ",".join(normalized)
-
+    def _migrate_subscriptions(self) -> None:
+        """Одноразово переносить users.keywords / users.topics у user_keywords / user_topics."""
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("UPDATE users SET keywords = ? WHERE chat_id = ?", (keywords_str, chat_id))
+            cur.execute("SELECT 1 FROM meta WHERE key = 'subscriptions_migrated'")
+            if cur.fetchone():
+                return
+
+            # бот і sender_worker можуть стартувати одночасно: перевіряємо ще
+            # раз під блокуванням запису — мігрує лише перший
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute("SELECT 1 FROM meta WHERE key = 'subscriptions_migrated'")
+            if cur.fetchone():
+                con.rollback()
+                return
+
+            cur.execute("SELECT chat_id, keywords, topics FROM users")
+            for chat_id, keywords, topics in cur.fetchall():
+                cur.executemany(
+                    "INSERT OR IGNORE INTO user_keywords (chat_id, keyword) VALUES (?, ?)",
+                    [(chat_id, k.strip()) for k in (keywords or "").split(",") if k.strip()],
+                )
+                cur.executemany(
+                    "INSERT OR IGNORE INTO user_topics (chat_id, topic_key) VALUES (?, ?)",
+                    [(chat_id, t.strip()) for t in (topics or "").split(",") if t.strip()],
+                )
+
+            cur.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('subscriptions_migrated', '1')")
             con.commit()
 
-        self.clear_sent_news(chat_id)
+    def _migrate_sent_news(self) -> None:
+        """
+        Стара sent_news(id, chat_id, link TEXT) -> (chat_id, link_hash, sent_at).
+        Хеш рахується від канонічного URL тією ж функцією, що й для нових
+        записів, тож уже надіслане не повториться. Копіювання, DROP і RENAME
+        ідуть однією IMMEDIATE-транзакцією: інші процеси бачать або стару,
+        або нову таблицю.
+        """
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("PRAGMA table_info(sent_news)")
+            cols = {row[1] for row in cur.fetchall()}
+            if "link" in cols:
+                cur.execute("BEGIN IMMEDIATE")
+                # інший процес міг встигнути мігрувати, поки ми чекали блокування
+                cur.execute("PRAGMA table_info(sent_news)")
+                cols = {row[1] for row in cur.fetchall()}
+            if "link" in cols:
+                con.create_function("link_hash", 1, link_hash, deterministic=True)
+                cur.execute(
+                    """
+                    CREATE TABLE sent_news_new (
+                        chat_id INTEGER NOT NULL,
+                        link_hash INTEGER NOT NULL,
+                        sent_at INTEGER NOT NULL,
+                        PRIMARY KEY (chat_id, link_hash)
+                    ) WITHOUT ROWID
+                    """
+                )
+                cur.execute(
+                    """
+                    INSERT OR IGNORE INTO sent_news_new (chat_id, link_hash, sent_at)
+                    SELECT chat_id, link_hash(link), ? FROM sent_news
+                    """,
+                    (int(time.time()),),
+                )
+                cur.execute("DROP TABLE sent_news")
+                cur.execute("ALTER TABLE sent_news_new RENAME TO sent_news")
+                cur.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('sent_news_hashed', ?)",
+                    (str(int(time.time())),),
+                )
 
-    def clear_keywords(self, chat_id: int) -> None:
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_sent_news_sent_at ON sent_news(sent_at)")
+            con.commit()
+
+    def _migrate_chat_history(self) -> None:
+        """
+        Стара chat_history(id AUTOINCREMENT, ...) -> кільцевий буфер
+        (chat_id, slot, seq). Переносимо останні CHAT_HISTORY_LIMIT
+        повідомлень кожного чату з тим самим порядком; одна транзакція.
+        """
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("UPDATE users SET keywords = ? WHERE chat_id = ?", ("", chat_id))
+            cur.execute("PRAGMA table_info(chat_history)")
+            cols = {row[1] for row in cur.fetchall()}
+            if "slot" not in cols:
+                cur.execute("BEGIN IMMEDIATE")
+                # інший процес міг встигнути мігрувати, поки ми чекали блокування
+                cur.execute("PRAGMA table_info(chat_history)")
+                cols = {row[1] for row in cur.fetchall()}
+            if "slot" not in cols:
+                cur.execute("ALTER TABLE chat_history RENAME TO chat_history_old")
+                cur.execute(
+                    """
+                    CREATE TABLE chat_history (
+                        chat_id INTEGER NOT NULL,
+                        slot INTEGER NOT NULL,
+                        seq INTEGER NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (chat_id, slot)
+                    )
+                    """
+                )
+                cur.execute(
+                    """
+                    INSERT INTO chat_history (chat_id, slot, seq, role, content, created_at)
+                    SELECT chat_id, seq % ?, seq, role, content, created_at FROM (
+                        SELECT chat_id, role, content, created_at,
+                               ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY id) AS seq,
+                               COUNT(*) OVER (PARTITION BY chat_id) AS total
+                        FROM chat_history_old
+                    )
+                    WHERE seq > total - ?
+                    """,
+                    (CHAT_HISTORY_LIMIT, CHAT_HISTORY_LIMIT),
+                )
+                cur.execute("DROP TABLE chat_history_old")
+                cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('chat_history_ring', '1')")
+
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_seq ON chat_history (chat_id, seq)")
+            # з яким лімітом розкладені слоти; інший ліміт -> trim_chat_history перекладе
+            cur.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('chat_history_limit', ?)",
+                (str(max(1, CHAT_HISTORY_LIMIT)),),
+            )
             con.commit()
 
-        self.clear_sent_news(chat_id)
+    def _warm_sent_cache(self) -> None:
+        """Останні SENT_CACHE_PER_CHAT надісланих посилань кожного чату — у кеш."""
+        with self._connect() as con:
+            cur = con.cursor()
+            # покоління — до читання посилань: очищення між ними sync_sent_cache побачить
+            cur.execute("SELECT chat_id, sent_generation FROM users")
+            self._sent_generations = dict(cur.fetchall())
+            cur.execute(
+                """
+                SELECT chat_id, link_hash FROM (
+                    SELECT chat_id, link_hash, sent_at,
+                           ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY sent_at DESC) AS rn
+                    FROM sent_news
+                )
+                WHERE rn <= ?
+                ORDER BY sent_at
+                """,
+                (SENT_CACHE_PER_CHAT,),
+            )
+            self._sent_cache.add(cur.fetchall())
+
+    # ---------- subscriptions ----------
+    def on_subscription_changed(self, callback: Callable[[int, int], None]) -> None:
+        """callback(chat_id, version) — version: subscriptions_version після цієї зміни."""
+        self._subscription_listeners.append(callback)
 
-    def get_keywords(self, chat_id: int) -> List[str]:
+    def _notify_subscription(self, chat_id: int, version: int) -> None:
+        for callback in self._subscription_listeners:
+            callback(chat_id, version)
+
+    def on_schedule_changed(self, callback: Callable[[int], None]) -> None:
+        self._schedule_listeners.append(callback)
+
+    def _notify_schedule(self, chat_id: int) -> None:
+        for callback in self._schedule_listeners:
+            callback(chat_id)
+
+    def _bump_subscriptions_version(self, cur: sqlite3.Cursor) -> int:
+        # Інші процеси за цією версією дізнаються, що індекс підписок застарів
+        cur.execute(
+            """
+            INSERT INTO meta (key, value) VALUES ('subscriptions_version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+            """
+        )
+        cur.execute("SELECT value FROM meta WHERE key = 'subscriptions_version'")
+        return int(cur.fetchone()[0])
+
+    def get_subscriptions_version(self) -> int:
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("SELECT keywords FROM users WHERE chat_id = ?", (chat_id,))
+            cur.execute("SELECT value FROM meta WHERE key = 'subscriptions_version'")
             row = cur.fetchone()
+        return int(row[0]) if row else 0
 
-        if not row or not row[0]:
-            return []
-        return [k.strip() for k in row[0].split(",") if k.strip()]
+    def get_subscriptions(self) -> Tuple[List[int], Dict[int, List[str]], Dict[int, List[str]]]:
+        """Усі chat_id, їхні ключові слова і теми — для побудови інвертованого індексу."""
+        keywords: Dict[int, List[str]] = {}
+        topics: Dict[int, List[str]] = {}
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("SELECT chat_id FROM users")
+            chat_ids = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT chat_id, keyword FROM user_keywords")
+            for chat_id, keyword in cur.fetchall():
+                keywords.setdefault(chat_id, []).append(keyword)
+            cur.execute("SELECT chat_id, topic_key FROM user_topics")
+            for chat_id, topic_key in cur.fetchall():
+                topics.setdefault(chat_id, []).append(topic_key)
+        return chat_ids, keywords, topics
 
-    # ---------- topics ----------
-    def set_topics(self, chat_id: int, topics: List[str]) -> None:
-        normalized = [t.strip().lower() for t in topics if t.strip()]
-        topics_str = ",".join(normalized)
+    # ---------- profile ----------
+    def _cache_profile(self, profile: UserProfile) -> None:
+        with self._profiles_lock:
+            self._profiles[profile.chat_id] = profile
+            self._profiles.move_to_end(profile.chat_id)
+            while len(self._profiles) > PROFILE_CACHE_SIZE:
+                self._profiles.popitem(last=False)
+
+    def _cached_profile(self, chat_id: int) -> Optional[UserProfile]:
+        with self._profiles_lock:
+            profile = self._profiles.get(chat_id)
+            if profile is not None:
+                self._profiles.move_to_end(chat_id)
+            return profile
+
+    def _update_profile(self, chat_id: int, **changes) -> None:
+        # лише для вже закешованих: відсутній запис прочитається з БД при потребі
+        with self._profiles_lock:
+            profile = self._profiles.get(chat_id)
+            if profile is not None:
+                self._profiles[chat_id] = replace(profile, **changes)
+
+    def _read_profile(self, cur: sqlite3.Cursor, chat_id: int) -> Optional[UserProfile]:
+        cur.execute(
+            "SELECT keywords, topics, input_state, auto_interval_sec FROM users WHERE chat_id = ?",
+            (chat_id,),
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        return UserProfile(
+            chat_id=chat_id,
+            keywords=_split_csv(row[0]),
+            topics=_split_csv(row[1]),
+            input_state=str(row[2] or ""),
+            auto_interval_sec=int(row[3]) if row[3] else AUTO_NEWS_INTERVAL_SEC,
+        )
+
+    def get_profile(self, chat_id: int) -> UserProfile:
+        """
+        Ключові слова, теми, стан вводу та інтервал одним запитом; далі — з
+        кешу, який тримають актуальним сетери цього процесу.
+        Невідомий користувач — профіль за замовчуванням (не кешується).
+        """
+        profile = self._cached_profile(chat_id)
+        if profile is not None:
+            return profile
+
+        with self._connect() as con:
+            profile = self._read_profile(con.cursor(), chat_id)
+
+        if profile is None:
+            return UserProfile(chat_id=chat_id)
+        self._cache_profile(profile)
+        return profile
+
+    def add_user_if_not_exists(self, chat_id: int) -> None:
+        # профіль у кеші — користувач точно вже є, БД не чіпаємо
+        if self._cached_profile(chat_id) is not None:
+            return
 
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("UPDATE users SET topics = ? WHERE chat_id = ?", (topics_str, chat_id))
+            cur.execute(
+                "INSERT OR IGNORE INTO users (chat_id, keywords, input_state, topics, auto_interval_sec) VALUES (?, ?, ?, ?, ?)",
+                (chat_id, "", "", "", AUTO_NEWS_INTERVAL_SEC),
+            )
+            added = cur.rowcount == 1
+            if added:
+                version = self._bump_subscriptions_version(cur)
             con.commit()
+            # тим самим зʼєднанням одразу читаємо профіль для наступних get_*
+            profile = self._read_profile(cur, chat_id)
 
-        self.clear_sent_news(chat_id)
+        if profile is not None:
+            self._cache_profile(profile)
+        if added:
+            self._notify_subscription(chat_id, version)
+            self._notify_schedule(chat_id)
 
-    def clear_topics(self, chat_id: int) -> None:
+    # ---------- keywords ----------
+    def _write_keywords(self, chat_id: int, keywords: List[str]) -> int:
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("UPDATE users SET topics = ? WHERE chat_id = ?", ("", chat_id))
+            cur.execute("UPDATE users SET keywords = ? WHERE chat_id = ?", (",".join(keywords), chat_id))
+            cur.execute("DELETE FROM user_keywords WHERE chat_id = ?", (chat_id,))
+            cur.executemany(
+                "INSERT OR IGNORE INTO user_keywords (chat_id, keyword) VALUES (?, ?)",
+                [(chat_id, k) for k in keywords],
+            )
+            # в одній транзакції з версією: інший процес, побачивши нову
+            # версію, бачить і нове sent_generation
+            generation = self._clear_sent_news(cur, chat_id)
+            version = self._bump_subscriptions_version(cur)
             con.commit()
 
-        self.clear_sent_news(chat_id)
+        self._update_profile(chat_id, keywords=tuple(keywords))
+        self._forget_sent(chat_id, generation)
+        self._notify_subscription(chat_id, version)
+        return version
 
-    def get_topics(self, chat_id: int) -> List[str]:
+    def set_keywords(self, chat_id: int, keywords: List[str]) -> int:
+        """Повертає нову subscriptions_version."""
+        normalized = [k.strip().lower() for k in keywords if k.strip()]
+        return self._write_keywords(chat_id, normalized)
+
+    def clear_keywords(self, chat_id: int) -> int:
+        return self._write_keywords(chat_id, [])
+
+    def get_keywords(self, chat_id: int) -> List[str]:
+        return list(self.get_profile(chat_id).keywords)
+
+    # ---------- topics ----------
+    def _write_topics(self, chat_id: int, topics: List[str]) -> int:
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("SELECT topics FROM users WHERE chat_id = ?", (chat_id,))
-            row = cur.fetchone()
+            cur.execute("UPDATE users SET topics = ? WHERE chat_id = ?", (",".join(topics), chat_id))
+            cur.execute("DELETE FROM user_topics WHERE chat_id = ?", (chat_id,))
+            cur.executemany(
+                "INSERT OR IGNORE INTO user_topics (chat_id, topic_key) VALUES (?, ?)",
+                [(chat_id, t) for t in topics],
+            )
+            # в одній транзакції з версією: інший процес, побачивши нову
+            # версію, бачить і нове sent_generation
+            generation = self._clear_sent_news(cur, chat_id)
+            version = self._bump_subscriptions_version(cur)
+            con.commit()
 
-        if not row or not row[0]:
-            return []
-        return [t.strip() for t in row[0].split(",") if t.strip()]
+        self._update_profile(chat_id, topics=tuple(topics))
+        self._forget_sent(chat_id, generation)
+        self._notify_subscription(chat_id, version)
+        return version
+
+    def set_topics(self, chat_id: int, topics: List[str]) -> int:
+        """Повертає нову subscriptions_version."""
+        normalized = [t.strip().lower() for t in topics if t.strip()]
+        return self._write_topics(chat_id, normalized)
+
+    def clear_topics(self, chat_id: int) -> int:
+        return self._write_topics(chat_id, [])
+
+    def get_topics(self, chat_id: int) -> List[str]:
+        return list(self.get_profile(chat_id).topics)
 
     # ---------- interval ----------
     def set_auto_interval(self, chat_id: int, interval_sec: int) -> None:
         interval_sec = max(60, int(interval_sec))
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("UPDATE users SET auto_interval_sec = ? WHERE chat_id = ?", (interval_sec, chat_id))
+            # коротший інтервал має діяти одразу, а не після старого next_due_at
+            cur.execute(
+                """
+                UPDATE users
+                SET auto_interval_sec = ?,
+                    next_due_at = CASE WHEN next_due_at > 0 THEN MIN(next_due_at, ?) ELSE next_due_at END
+                WHERE chat_id = ?
+                """,
+                (interval_sec, int(time.time()) + interval_sec, chat_id),
+            )
             con.commit()
+        self._update_profile(chat_id, auto_interval_sec=interval_sec)
+        self._notify_schedule(chat_id)
 
     def get_auto_interval(self, chat_id: int) -> int:
+        return self.get_profile(chat_id).auto_interval_sec
+
+    # ---------- schedule ----------
+    def get_schedule(
+        self,
+        chat_ids: Optional[List[int]] = None,
+        shard_count: int = 0,
+        shards: Optional[List[int]] = None,
+    ) -> List[Tuple[int, int, int]]:
+        """
+        (chat_id, next_due_at, інтервал) для планувальника; next_due_at 0 = вже час.
+        shard_count + shards — лише чати цих шардів (abs(chat_id) % shard_count).
+        """
+        sql = "SELECT chat_id, next_due_at, auto_interval_sec FROM users"
+        where: List[str] = []
+        params: List = []
+        if chat_ids is not None:
+            if not chat_ids:
+                return []
+            where.append(f"chat_id IN ({','.join('?' for _ in chat_ids)})")
+            params.extend(chat_ids)
+        if shard_count and shards is not None:
+            if not shards:
+                return []
+            where.append(f"abs(chat_id) % ? IN ({','.join('?' for _ in shards)})")
+            params.append(shard_count)
+            params.extend(shards)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("SELECT auto_interval_sec FROM users WHERE chat_id = ?", (chat_id,))
-            row = cur.fetchone()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+        return [(r[0], int(r[1] or 0), int(r[2]) if r[2] else AUTO_NEWS_INTERVAL_SEC) for r in rows]
 
-        if not row or not row[0]:
-            return AUTO_NEWS_INTERVAL_SEC
-        return int(row[0])
+    def set_next_due_many(self, due: List[Tuple[int, int]]) -> None:
+        if not due:
+            return
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.executemany(
+                "UPDATE users SET next_due_at = ? WHERE chat_id = ?",
+                [(next_due_at, chat_id) for chat_id, next_due_at in due],
+            )
+            con.commit()
 
-    # ---------- input state ----------
-    def set_input_state(self, chat_id: int, state: str) -> None:
+    # ---------- sender leases ----------
+    def init_sender_shards(self, shard_count: int) -> None:
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("UPDATE users SET input_state = ? WHERE chat_id = ?", (state or "", chat_id))
+            cur.executemany(
+                "INSERT OR IGNORE INTO sender_leases (shard, owner, expires_at) VALUES (?, NULL, 0)",
+                [(shard,) for shard in range(shard_count)],
+            )
             con.commit()
 
-    def get_input_state(self, chat_id: int) -> str:
+    def heartbeat_sender(self, owner: str, now: float, stale_before: float) -> int:
+        """Відмічає воркер живим, прибирає мертвих; повертає кількість живих воркерів."""
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("SELECT input_state FROM users WHERE chat_id = ?", (chat_id,))
-            row = cur.fetchone()
+            cur.execute(
+                """
+                INSERT INTO sender_workers (owner, heartbeat_at) VALUES (?, ?)
+                ON CONFLICT(owner) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+                """,
+                (owner, now),
+            )
+            cur.execute("DELETE FROM sender_workers WHERE heartbeat_at < ?", (stale_before,))
+            cur.execute("SELECT COUNT(*) FROM sender_workers")
+            alive = cur.fetchone()[0]
+            con.commit()
+        return alive
 
-        if not row or not row[0]:
-            return ""
-        return str(row[0])
+    def renew_sender_leases(self, owner: str, expires_at: float, shard_count: int) -> List[int]:
+        """Продовжує всі шарди власника; повертає ті, що досі його."""
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                "UPDATE sender_leases SET expires_at = ? WHERE owner = ? AND shard < ?",
+                (expires_at, owner, shard_count),
+            )
+            cur.execute("SELECT shard FROM sender_leases WHERE owner = ? AND shard < ?", (owner, shard_count))
+            owned = [r[0] for r in cur.fetchall()]
+            con.commit()
+        return owned
+
+    def acquire_sender_leases(self, owner: str, now: float, expires_at: float, shard_count: int, limit: int) -> List[int]:
+        """
+        Захоплює до limit вільних або прострочених шардів. Кожен шард —
+        умовний UPDATE, тож два процеси не візьмуть той самий.
+        """
+        if limit <= 0:
+            return []
+        acquired: List[int] = []
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT shard FROM sender_leases
+                WHERE shard < ? AND (owner IS NULL OR expires_at < ?)
+                ORDER BY shard
+                """,
+                (shard_count, now),
+            )
+            for (shard,) in cur.fetchall():
+                cur.execute(
+                    """
+                    UPDATE sender_leases SET owner = ?, expires_at = ?
+                    WHERE shard = ? AND (owner IS NULL OR expires_at < ?)
+                    """,
+                    (owner, expires_at, shard, now),
+                )
+                if cur.rowcount == 1:
+                    acquired.append(shard)
+                    if len(acquired) >= limit:
+                        break
+            con.commit()
+        return acquired
+
+    def release_sender_leases(self, owner: str, shards: List[int]) -> None:
+        if not shards:
+            return
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.executemany(
+                "UPDATE sender_leases SET owner = NULL, expires_at = 0 WHERE shard = ? AND owner = ?",
+                [(shard, owner) for shard in shards],
+            )
+            con.commit()
+
+    def remove_sender(self, owner: str) -> None:
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("UPDATE sender_leases SET owner = NULL, expires_at = 0 WHERE owner = ?", (owner,))
+            cur.execute("DELETE FROM sender_workers WHERE owner = ?", (owner,))
+            con.commit()
+
+    # ---------- input state ----------
+    def set_input_state(self, chat_id: int, state: str) -> None:
+        state = state or ""
+        profile = self._cached_profile(chat_id)
+        if profile is not None and profile.input_state == state:
+            return  # нічого не змінилось (типово: скидання вже порожнього стану)
+
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("UPDATE users SET input_state = ? WHERE chat_id = ?", (state, chat_id))
+            con.commit()
+        self._update_profile(chat_id, input_state=state)
+
+    def get_input_state(self, chat_id: int) -> str:
+        return self.get_profile(chat_id).input_state
 
     # ---------- users ----------
     def get_all_chat_ids(self) -> List[int]:
@@ -193,57 +849,525 @@ class Storage:
     def clear_sent_news(self, chat_id: int) -> None:
         with self._connect() as con:
             cur = con.cursor()
-            cur.execute("DELETE FROM sent_news WHERE chat_id = ?", (chat_id,))
+            generation = self._clear_sent_news(cur, chat_id)
             con.commit()
+        self._forget_sent(chat_id, generation)
 
-    def filter_new_items(self, chat_id: int, items: List[Dict]) -> List[Dict]:
-        new_items: List[Dict] = []
+    def _clear_sent_news(self, cur: sqlite3.Cursor, chat_id: int) -> int:
+        cur.execute("DELETE FROM sent_news WHERE chat_id = ?", (chat_id,))
+        # нове покоління: ті самі посилання знову дадуть новий ключ outbox, а
+        # інші процеси за ним скинуть свій кеш надісланих (sync_sent_cache)
+        cur.execute("UPDATE users SET sent_generation = sent_generation + 1 WHERE chat_id = ?", (chat_id,))
+        cur.execute("SELECT sent_generation FROM users WHERE chat_id = ?", (chat_id,))
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+    def _forget_sent(self, chat_id: int, generation: int) -> None:
+        self._sent_cache.forget_chat(chat_id)
+        self._sent_generations[chat_id] = generation
+
+    def sync_sent_cache(self) -> int:
+        """
+        Кеш надісланих — свій у кожному процесі, а clear_sent_news (зміна
+        ключів чи тем) скидає його лише там, де викликаний. Тут скидаємо
+        чати, чиє sent_generation змінилося в іншому процесі. Викликається,
+        коли змінилася subscriptions_version. Повертає кількість скинутих чатів.
+        """
         with self._connect() as con:
             cur = con.cursor()
+            cur.execute("SELECT chat_id, sent_generation FROM users")
+            current = dict(cur.fetchall())
+
+        forgotten = 0
+        for chat_id, generation in current.items():
+            known = self._sent_generations.get(chat_id)
+            if known is not None and known != generation:
+                self._sent_cache.forget_chat(chat_id)
+                forgotten += 1
+        self._sent_generations = current
+        return forgotten
+
+    def sent_cache_stats(self) -> Dict:
+        return self._sent_cache.stats()
+
+    def filter_new_items(self, chat_id: int, items: List[Dict]) -> List[Dict]:
+        return self.filter_new_items_many({chat_id: items}).get(chat_id, [])
+
+    def filter_new_items_many(self, batches: Dict[int, List[Dict]]) -> Dict[int, List[Dict]]:
+        """
+        Дедуп проти sent_news для багатьох чатів однією транзакцією. Пари
+        (chat_id, link_hash), які кеш знає як надіслані, відкидаються одразу;
+        решта йде у тимчасову таблицю, нові вставляються
+        одним INSERT ... SELECT і повертаються через RETURNING (SQLite >= 3.35;
+        на старіших — NOT EXISTS перед вставкою). Порядок елементів
+        зберігається, повтор посилання в межах чату лишає перше входження.
+        """
+        pending: Dict[Tuple[int, int], Dict] = {}
+        for chat_id, items in batches.items():
             for item in items:
-                link = (item.get("link") or "").strip()
-                if not link:
+                h = item_hash(item)
+                if h is None:
                     continue
+                key = (chat_id, h)
+                if key not in pending:
+                    pending[key] = item
+
+        result: Dict[int, List[Dict]] = {chat_id: [] for chat_id in batches}
+        if not pending:
+            return result
+
+        # точно надіслані відсікає кеш, у SQL ідуть лише невідомі
+        _, unknown = self._sent_cache.split(pending)
+        if not unknown:
+            return result
+
+        with self._connect() as con:
+            fresh = self._mark_sent(con.cursor(), unknown, int(time.time()))
+            con.commit()
+
+        # після коміту всі невідомі вже є в sent_news — і нові, і старі
+        self._sent_cache.add(unknown)
+
+        for key, item in pending.items():
+            if key in fresh:
+                result[key[0]].append(item)
+        return result
+
+    def _mark_sent(self, cur: sqlite3.Cursor, pairs: List[Tuple[int, int]], now: int) -> set:
+        """
+        Вставляє пари (chat_id, link_hash) у sent_news і повертає ті, яких там
+        ще не було. Один INSERT ... SELECT з тимчасової таблиці, нові — через
+        RETURNING (SQLite >= 3.35; на старіших — NOT EXISTS перед вставкою).
+        """
+        cur.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS batch_links (chat_id INTEGER NOT NULL, link_hash INTEGER NOT NULL)"
+        )
+        cur.execute("DELETE FROM temp.batch_links")
+        cur.executemany("INSERT INTO temp.batch_links (chat_id, link_hash) VALUES (?, ?)", pairs)
+
+        if _HAS_RETURNING:
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO sent_news (chat_id, link_hash, sent_at)
+                SELECT chat_id, link_hash, ? FROM temp.batch_links WHERE true
+                RETURNING chat_id, link_hash
+                """,
+                (now,),
+            )
+            fresh = set(cur.fetchall())
+        else:
+            cur.execute(
+                """
+                SELECT b.chat_id, b.link_hash FROM temp.batch_links b
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM sent_news s WHERE s.chat_id = b.chat_id AND s.link_hash = b.link_hash
+                )
+                """
+            )
+            fresh = set(cur.fetchall())
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO sent_news (chat_id, link_hash, sent_at)
+                SELECT chat_id, link_hash, ? FROM temp.batch_links
+                """,
+                (now,),
+            )
+
+        cur.execute("DELETE FROM temp.batch_links")
+        return fresh
+
+    def peek_new_items_many(self, batches: Dict[int, List[Dict]]) -> Dict[int, List[Dict]]:
+        """
+        Як filter_new_items_many, але нічого не позначає: посилання стають
+        надісланими лише в enqueue_digest, разом із записом в outbox.
+        """
+        pending: Dict[Tuple[int, int], Dict] = {}
+        for chat_id, items in batches.items():
+            for item in items:
+                h = item_hash(item)
+                if h is None:
+                    continue
+                key = (chat_id, h)
+                if key not in pending:
+                    pending[key] = item
+
+        result: Dict[int, List[Dict]] = {chat_id: [] for chat_id in batches}
+        _, unknown = self._sent_cache.split(pending)
+        if not unknown:
+            return result
 
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS batch_links (chat_id INTEGER NOT NULL, link_hash INTEGER NOT NULL)"
+            )
+            cur.execute("DELETE FROM temp.batch_links")
+            cur.executemany("INSERT INTO temp.batch_links (chat_id, link_hash) VALUES (?, ?)", unknown)
+            cur.execute(
+                """
+                SELECT b.chat_id, b.link_hash FROM temp.batch_links b
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM sent_news s WHERE s.chat_id = b.chat_id AND s.link_hash = b.link_hash
+                )
+                """
+            )
+            fresh = set(cur.fetchall())
+            cur.execute("DELETE FROM temp.batch_links")
+            con.commit()
+
+        self._sent_cache.add(k for k in unknown if k not in fresh)
+        for key, item in pending.items():
+            if key in fresh:
+                result[key[0]].append(item)
+        return result
+
+    def enqueue_digest(
+        self,
+        chat_id: int,
+        items: List[Dict],
+        parts: List[str],
+        parse_mode: Optional[str] = None,
+        history_text: str = "",
+        render: Optional[Callable[[List[Dict]], Tuple[List[str], Optional[str], str]]] = None,
+    ) -> bool:
+        """
+        Одна транзакція: посилання items -> sent_news, частини дайджесту ->
+        outbox, текст -> chat_history. У outbox іде лише те, що вставилося
+        в sent_news саме зараз (RETURNING): якщо частину посилань уже
+        надіслав інший відправник (передача шарду), транзакція відкочується,
+        дайджест перебудовується render(нові items) — без транзакції і без
+        зʼєднання з пулу, бо render може йти в LLM, — і спроба повторюється
+        з новою перевіркою sent_news; якщо нових немає — False.
+
+        Ключ outbox — чат + покоління sent_news (clear_sent_news його
+        збільшує) + набір посилань.
+        """
+        while True:
+            by_hash: Dict[int, Dict] = {}
+            for it in items:
+                h = item_hash(it)
+                if h is not None:
+                    by_hash.setdefault(h, it)
+            parts = [p for p in parts if p]
+            if not parts or not by_hash:
+                return False
+
+            hashes = sorted(by_hash)
+            now = time.time()
+            with self._connect() as con:
+                cur = con.cursor()
+                cur.execute("BEGIN IMMEDIATE")
+                fresh = {h for _, h in self._mark_sent(cur, [(chat_id, h) for h in hashes], int(now))}
+                partial = len(fresh) != len(hashes)
+                if partial:
+                    con.rollback()
+                elif not self._write_digest(cur, chat_id, hashes, parts, parse_mode, history_text, now):
+                    con.rollback()
+                    return False
+                else:
+                    con.commit()
+
+            if partial:
+                # решту вже позначено надісланими — це знає і кеш
+                self._sent_cache.add((chat_id, h) for h in hashes if h not in fresh)
+                if not fresh or render is None:
+                    return False
+                items = [it for h, it in by_hash.items() if h in fresh]
+                parts, parse_mode, history_text = render(items)
+                continue
+
+            self._sent_cache.add((chat_id, h) for h in hashes)
+            return True
+
+    def _write_digest(
+        self,
+        cur: sqlite3.Cursor,
+        chat_id: int,
+        hashes: List[int],
+        parts: List[str],
+        parse_mode: Optional[str],
+        history_text: str,
+        now: float,
+    ) -> bool:
+        """
+        Частини дайджесту -> outbox і текст -> chat_history (у транзакції
+        enqueue_digest). False — дайджест із таким ключем уже є.
+        """
+        cur.execute("SELECT COALESCE(MAX(sent_generation), 0) FROM users WHERE chat_id = ?", (chat_id,))
+        generation = cur.fetchone()[0]
+        digest_key = f"{chat_id}:{generation}:" + hashlib.blake2b(
+            ",".join(map(str, hashes)).encode("ascii"), digest_size=12
+        ).hexdigest()
+
+        cur.execute(
+            """
+            INSERT OR IGNORE INTO outbox (chat_id, digest_key, part, text, parse_mode, next_attempt_at, created_at)
+            VALUES (?, ?, 0, ?, ?, ?, ?)
+            """,
+            (chat_id, digest_key, parts[0], parse_mode, now, now),
+        )
+        if cur.rowcount != 1:
+            return False
+
+        cur.executemany(
+            """
+            INSERT INTO outbox (chat_id, digest_key, part, text, parse_mode, next_attempt_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(chat_id, digest_key, i, text, parse_mode, now, now) for i, text in enumerate(parts[1:], start=1)],
+        )
+        if history_text.strip():
+            self._insert_chat_message(cur, chat_id, "assistant", history_text.strip())
+        return True
+
+    def claim_outbox(self, now: float, claim_sec: float, limit: int) -> List[Dict]:
+        """
+        Забирає до limit частин на надсилання. З кожного чату — лише
+        найранішу ненадіслану частину, і лише якщо попередня не в польоті:
+        так частини йдуть строго по черзі навіть між кількома процесами.
+        Зависле 'sending' (процес впав) після claimed_until знову доступне.
+        Кожен claim збільшує attempts — пара (id, attempts) ідентифікує його
+        для touch_outbox.
+        """
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(
+                """
+                SELECT o.id, o.chat_id, o.part, o.text, o.parse_mode, o.attempts
+                FROM outbox o
+                WHERE ((o.status = 'pending' AND o.next_attempt_at <= ?)
+                       OR (o.status = 'sending' AND o.claimed_until < ?))
+                  AND NOT EXISTS (
+                    SELECT 1 FROM outbox p
+                    WHERE p.chat_id = o.chat_id AND p.id < o.id AND p.status IN ('pending', 'sending')
+                  )
+                ORDER BY o.id
+                LIMIT ?
+                """,
+                (now, now, limit),
+            )
+            rows = cur.fetchall()
+            cur.executemany(
+                "UPDATE outbox SET status = 'sending', claimed_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(now + claim_sec, r[0]) for r in rows],
+            )
+            con.commit()
+
+        return [
+            {"id": r[0], "chat_id": r[1], "part": r[2], "text": r[3], "parse_mode": r[4], "attempts": r[5] + 1}
+            for r in rows
+        ]
+
+    def touch_outbox(self, outbox_id: int, attempts: int, claimed_until: float) -> bool:
+        """
+        Продовжує claim перед самою відправкою. False — claim уже не наш
+        (прострочився і рядок забрав інший відправник, або рядок завершено),
+        тож надсилати не можна.
+        """
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                UPDATE outbox SET claimed_until = ?
+                WHERE id = ? AND attempts = ? AND status = 'sending'
+                """,
+                (claimed_until, outbox_id, attempts),
+            )
+            touched = cur.rowcount == 1
+            con.commit()
+        return touched
+
+    def complete_outbox(self, outbox_id: int) -> None:
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+                (time.time(), outbox_id),
+            )
+            con.commit()
+
+    def fail_outbox(self, outbox_id: int, error: str, retry_at: Optional[float]) -> None:
+        """retry_at — коли повторити; None — спроби вичерпано (status 'failed')."""
+        with self._connect() as con:
+            cur = con.cursor()
+            if retry_at is None:
                 cur.execute(
-                    "INSERT OR IGNORE INTO sent_news (chat_id, link) VALUES (?, ?)",
-                    (chat_id, link),
+                    "UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                    (error[:500], outbox_id),
+                )
+            else:
+                cur.execute(
+                    "UPDATE outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (retry_at, error[:500], outbox_id),
                 )
-                if cur.rowcount == 1:
-                    new_items.append(item)
             con.commit()
-        return new_items
 
-    # ---------- chat history ----------
-    def add_chat_message(self, chat_id: int, role: str, content: str) -> None:
-        content = (content or "").strip()
-        if not content:
-            return
+    def outbox_stats(self) -> Dict[str, int]:
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+            rows = cur.fetchall()
+        return {status: count for status, count in rows}
+
+    def prune_outbox(self, older_than: float, batch_size: int = 5000) -> int:
+        """Видаляє надіслані й остаточно невдалі частини, старші за older_than."""
+        removed = 0
+        while True:
+            with self._connect() as con:
+                cur = con.cursor()
+                cur.execute(
+                    """
+                    DELETE FROM outbox WHERE id IN (
+                        SELECT id FROM outbox WHERE status IN ('sent', 'failed') AND created_at < ? LIMIT ?
+                    )
+                    """,
+                    (older_than, batch_size),
+                )
+                deleted = cur.rowcount
+                con.commit()
+            removed += deleted
+            if deleted < batch_size:
+                return removed
 
+    # ---------- кеш LLM ----------
+    def get_llm_cache(self, key: str, fresh_after: float) -> Optional[Tuple[str, float]]:
+        """(значення, created_at) для запису, створеного після fresh_after, або None. Лише читання."""
         with self._connect() as con:
             cur = con.cursor()
             cur.execute(
-                "INSERT INTO chat_history (chat_id, role, content) VALUES (?, ?, ?)",
-                (chat_id, role, content),
+                "SELECT value, created_at FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, fresh_after),
             )
+            row = cur.fetchone()
+        return (row[0], row[1]) if row else None
+
+    def touch_llm_cache(self, accessed: List[Tuple[str, float]]) -> None:
+        """Пачка (ключ, час доступу) -> accessed_at, за яким prune_llm_cache витісняє."""
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.executemany(
+                "UPDATE llm_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(at, key) for key, at in accessed],
+            )
+            con.commit()
 
+    def put_llm_cache(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._connect() as con:
+            cur = con.cursor()
             cur.execute(
                 """
-                DELETE FROM chat_history
-                WHERE chat_id = ?
-                  AND id NOT IN (
-                    SELECT id FROM chat_history
-                    WHERE chat_id = ?
-                    ORDER BY id DESC
-                    LIMIT ?
-                  )
+                INSERT INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    created_at = excluded.created_at,
+                    accessed_at = excluded.accessed_at
                 """,
-                (chat_id, chat_id, CHAT_HISTORY_LIMIT),
+                (key, value, now, now),
             )
+            con.commit()
 
+    def prune_llm_cache(self, older_than: float, max_entries: int) -> int:
+        """Видаляє записи, створені до older_than, і найдавніше використані понад max_entries."""
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (older_than,))
+            removed = cur.rowcount
+            cur.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (max(0, max_entries),),
+            )
+            removed += cur.rowcount
             con.commit()
+        return removed
+
+    def prune_articles(self, older_than_days: float, batch_size: int = 5000) -> int:
+        """
+        Видаляє статті, вперше побачені понад older_than_days днів тому.
+        articles_fts синхронізує тригер articles_fts_ad. Порціями, як
+        prune_sent_news. Повертає кількість видалених статей.
+        """
+        older_than = int(time.time() - older_than_days * 86400)
+        removed = 0
+        while True:
+            with self._connect() as con:
+                cur = con.cursor()
+                cur.execute(
+                    """
+                    DELETE FROM articles WHERE id IN (
+                        SELECT id FROM articles WHERE first_seen_at < ? LIMIT ?
+                    )
+                    """,
+                    (older_than, batch_size),
+                )
+                deleted = cur.rowcount
+                con.commit()
+            removed += deleted
+            if deleted < batch_size:
+                return removed
+
+    def prune_sent_news(self, older_than: int, batch_size: int = 5000) -> int:
+        """
+        Видаляє записи sent_news, надіслані раніше за older_than (unix).
+        Порціями по batch_size, кожна своєю транзакцією, щоб не тримати
+        блокування запису довго. Повертає кількість видалених рядків.
+        """
+        removed = 0
+        while True:
+            with self._connect() as con:
+                cur = con.cursor()
+                cur.execute(
+                    """
+                    DELETE FROM sent_news WHERE (chat_id, link_hash) IN (
+                        SELECT chat_id, link_hash FROM sent_news WHERE sent_at < ? LIMIT ?
+                    )
+                    """,
+                    (older_than, batch_size),
+                )
+                deleted = cur.rowcount
+                con.commit()
+            removed += deleted
+            if deleted < batch_size:
+                return removed
+
+    # ---------- chat history ----------
+    def add_chat_message(self, chat_id: int, role: str, content: str) -> None:
+        """
+        Кільцевий буфер на CHAT_HISTORY_LIMIT слотів: наступний seq чату
+        (MAX по індексу chat_id, seq) пише в слот seq % limit поверх
+        найстарішого повідомлення. Один upsert без сканування таблиці.
+        """
+        content = (content or "").strip()
+        if not content:
+            return
+
+        with self._connect() as con:
+            self._insert_chat_message(con.cursor(), chat_id, role, content)
+            con.commit()
+
+    def _insert_chat_message(self, cur: sqlite3.Cursor, chat_id: int, role: str, content: str) -> None:
+        cur.execute(
+            """
+            INSERT INTO chat_history (chat_id, slot, seq, role, content, created_at)
+            SELECT ?, next_seq % ?, next_seq, ?, ?, CURRENT_TIMESTAMP
+            FROM (SELECT COALESCE(MAX(seq), 0) + 1 AS next_seq FROM chat_history WHERE chat_id = ?)
+            WHERE true
+            ON CONFLICT(chat_id, slot) DO UPDATE SET
+                seq = excluded.seq,
+                role = excluded.role,
+                content = excluded.content,
+                created_at = excluded.created_at
+            """,
+            (chat_id, max(1, CHAT_HISTORY_LIMIT), role, content, chat_id),
+        )
 
     def get_chat_history(self, chat_id: int) -> List[Tuple[str, str]]:
+        # seq-вікно відсікає слоти, що лишились після зменшення CHAT_HISTORY_LIMIT
         with self._connect() as con:
             cur = con.cursor()
             cur.execute(
@@ -251,12 +1375,236 @@ class Storage:
                 SELECT role, content
                 FROM chat_history
                 WHERE chat_id = ?
-                ORDER BY id ASC
+                  AND seq > (SELECT COALESCE(MAX(seq), 0) FROM chat_history WHERE chat_id = ?) - ?
+                ORDER BY seq ASC
                 """,
-                (chat_id,),
+                (chat_id, chat_id, max(1, CHAT_HISTORY_LIMIT)),
             )
             rows = cur.fetchall()
         return [(r[0], r[1]) for r in rows]
 
+    def trim_chat_history(self, batch_size: int = 5000) -> int:
+        """
+        Фонова чистка після зміни CHAT_HISTORY_LIMIT (при незмінному ліміті
+        нічого не робить): порціями видаляє повідомлення поза вікном
+        останніх limit кожного чату, потім перекладає слоти на seq % limit.
+        """
+        limit = max(1, CHAT_HISTORY_LIMIT)
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("SELECT value FROM meta WHERE key = 'chat_history_limit'")
+            row = cur.fetchone()
+        if row and row[0] == str(limit):
+            return 0
+
+        removed = 0
+        while True:
+            with self._connect() as con:
+                cur = con.cursor()
+                cur.execute(
+                    """
+                    DELETE FROM chat_history WHERE rowid IN (
+                        SELECT h.rowid FROM chat_history h
+                        JOIN (SELECT chat_id, MAX(seq) AS last_seq FROM chat_history GROUP BY chat_id) t
+                          ON t.chat_id = h.chat_id
+                        WHERE h.seq <= t.last_seq - ?
+                        LIMIT ?
+                    )
+                    """,
+                    (limit, batch_size),
+                )
+                deleted = cur.rowcount
+                con.commit()
+            removed += deleted
+            if deleted < batch_size:
+                break
+
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            # через відʼємні значення, щоб не зачепити PRIMARY KEY посеред UPDATE
+            cur.execute("UPDATE chat_history SET slot = -1 - (seq % ?)", (limit,))
+            cur.execute("UPDATE chat_history SET slot = -1 - slot")
+            cur.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('chat_history_limit', ?)",
+                (str(limit),),
+            )
+            con.commit()
+        return removed
+
+    # ---------- articles ----------
+    def upsert_articles(self, items: List[Dict]) -> int:
+        """
+        Зберігає нормалізовані статті. Повторний запис оновлює текст і дату,
+        але first_seen_at лишається від першої появи. Повертає кількість нових.
+        """
+        now = int(time.time())
+        rows = []
+        for item in items:
+            link = (item.get("link") or "").strip()
+            topic_key = (item.get("topic_key") or "").strip()
+            if not link or not topic_key:
+                continue
+            rows.append(
+                (
+                    link,
+                    topic_key,
+                    item.get("title", ""),
+                    item.get("summary", ""),
+                    int(item.get("published_at") or 0),
+                    now,
+                )
+            )
+
+        if not rows:
+            return 0
+
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.executemany(
+                """
+                INSERT INTO articles (link, topic_key, title, summary, published_at, first_seen_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(link, topic_key) DO NOTHING
+                """,
+                rows,
+            )
+            inserted = cur.rowcount
+            cur.executemany(
+                """
+                UPDATE articles SET title = ?, summary = ?, published_at = ?
+                WHERE link = ? AND topic_key = ?
+                  AND (title != ? OR summary != ? OR published_at != ?)
+                """,
+                [(r[2], r[3], r[4], r[0], r[1], r[2], r[3], r[4]) for r in rows],
+            )
+            con.commit()
+        return inserted
+
+    def get_articles(
+        self,
+        topics: Optional[List[str]] = None,
+        per_topic: int = 100,
+        seen_since: int = 0,
+    ) -> List[Dict]:
+        """
+        Останні per_topic статей кожної теми (за датою публікації), які
+        зʼявились не раніше seen_since.
+        """
+        params: List = [seen_since]
+        topic_filter = ""
+        if topics:
+            topic_filter = f"AND topic_key IN ({','.join('?' for _ in topics)})"
+            params.extend(topics)
+        params.append(per_topic)
+
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"""
+                SELECT link, topic_key, title, summary, published_at, first_seen_at
+                FROM (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY topic_key ORDER BY published_at DESC, id DESC
+                    ) AS rn
+                    FROM articles
+                    WHERE first_seen_at >= ? {topic_filter}
+                )
+                WHERE rn <= ?
+                ORDER BY published_at DESC, id DESC
+                """,
+                params,
+            )
+            rows = cur.fetchall()
+
+        return [
+            {
+                "link": r[0],
+                "topic_key": r[1],
+                "title": r[2],
+                "summary": r[3],
+                "published_at": r[4],
+                "first_seen_at": r[5],
+            }
+            for r in rows
+        ]
+
+    def search_articles(
+        self,
+        query: str,
+        topics: Optional[List[str]] = None,
+        published_from: int = 0,
+        published_to: int = 0,
+        limit: int = 30,
+    ) -> List[Dict]:
+        """
+        Пошук по збережених статтях: FTS5 з ранжуванням BM25 (заголовок важить
+        більше за опис), кожне слово запиту — префіксний запит. Фільтри:
+        теми і діапазон дати публікації. Одна стаття з кількох тем — один раз.
+        """
+        terms = [t for t in re.findall(r"\w+", (query or "").lower()) if t]
+        if not terms:
+            return []
+
+        where: List[str] = []
+        params: List = []
+        if topics:
+            where.append(f"a.topic_key IN ({','.join('?' for _ in topics)})")
+            params.extend(topics)
+        if published_from:
+            where.append("a.published_at >= ?")
+            params.append(published_from)
+        if published_to:
+            where.append("a.published_at <= ?")
+            params.append(published_to)
+
+        if self._fts:
+            # bm25() не можна загортати в агрегат, тому дублікати (та сама
+            # стаття в кількох темах) відкидаємо при читанні курсора.
+            match = " ".join(f'"{t}"*' for t in terms)
+            sql = f"""
+                SELECT a.link, a.topic_key, a.title, a.summary, a.published_at, a.first_seen_at
+                FROM articles_fts
+                JOIN articles a ON a.id = articles_fts.rowid
+                WHERE articles_fts MATCH ? {''.join(' AND ' + w for w in where)}
+                ORDER BY bm25(articles_fts, 10.0, 1.0), a.published_at DESC
+            """
+            params = [match, *params]
+        else:
+            likes = []
+            for t in terms:
+                likes.append("(lower(a.title) LIKE ? OR lower(a.summary) LIKE ?)")
+                params.extend([f"%{t}%", f"%{t}%"])
+            sql = f"""
+                SELECT a.link, a.topic_key, a.title, a.summary, a.published_at, a.first_seen_at
+                FROM articles a
+                WHERE {' AND '.join(where + likes)}
+                ORDER BY a.published_at DESC
+            """
+
+        result: List[Dict] = []
+        seen = set()
+        with self._connect() as con:
+            cur = con.cursor()
+            cur.execute(sql, params)
+            for r in cur:
+                if r[0] in seen:
+                    continue
+                seen.add(r[0])
+                result.append(
+                    {
+                        "link": r[0],
+                        "topic_key": r[1],
+                        "title": r[2],
+                        "summary": r[3],
+                        "published_at": r[4],
+                        "first_seen_at": r[5],
+                    }
+                )
+                if len(result) >= limit:
+                    break
+
+        return result
+
 
 storage = Storage(DB_PATH)
@@ -0,0 +1,195 @@
+# subscription_index.py
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from keyword_matcher import KeywordMatcher
+from news_fetcher import assemble_items
+from storage import storage
+
+# Профіль = (ключові слова, теми). Користувачі з однаковими налаштуваннями
+# мають один профіль, і стрічка для них рахується один раз.
+Profile = Tuple[FrozenSet[str], FrozenSet[str]]
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+
+class SubscriptionIndex:
+    """
+    Інвертований індекс підписок: ключове слово / тема -> профілі -> chat_id.
+    Для статті одразу дає множину зацікавлених профілів, тож вартість розсилки
+    росте з кількістю збігів, а не з кількістю користувачів.
+
+    Порожні ключові слова = без фільтра, порожні теми = усі теми.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.matcher = KeywordMatcher()
+        self._version = -1
+        self._clear()
+
+    def _clear(self) -> None:
+        self._chat_profile: Dict[int, Profile] = {}
+        self._chat_keywords: Dict[int, List[str]] = {}
+        self._profile_chats: Dict[Profile, Set[int]] = {}
+        self._kw_profiles: Dict[str, Set[Profile]] = {}
+        self._topic_profiles: Dict[str, Set[Profile]] = {}
+        self._no_kw_profiles: Set[Profile] = set()
+        self._no_topic_profiles: Set[Profile] = set()
+
+    # ---------- завантаження ----------
+    def reload(self) -> None:
+        version = storage.get_subscriptions_version()
+        chat_ids, keywords, topics = storage.get_subscriptions()
+        with self._lock:
+            self._clear()
+            for chat_id in chat_ids:
+                self._set_locked(chat_id, keywords.get(chat_id, []), topics.get(chat_id, []))
+            self.matcher.reset(keywords)
+            self._version = version
+        # ключі/теми могли змінитись в іншому процесі — там же очищено sent_news
+        storage.sync_sent_cache()
+
+    def refresh(self) -> None:
+        """Перечитує індекс, якщо підписки змінювались (зокрема в іншому процесі)."""
+        if storage.get_subscriptions_version() != self._version:
+            self.reload()
+
+    def on_change(self, chat_id: int, version: int) -> None:
+        if self._version < 0:
+            return  # ще не завантажений — все одно прочитаємо все при першому refresh
+        profile = storage.get_profile(chat_id)
+        keywords, topics = profile.keywords, profile.topics
+        with self._lock:
+            self._set_locked(chat_id, keywords, topics)
+            self.matcher.set_user_keywords(chat_id, keywords)
+            # зміна з цього процесу вже врахована інкрементально; якщо між
+            # версіями були чужі зміни — refresh перечитає все
+            if version == self._version + 1:
+                self._version = version
+
+    def _set_locked(self, chat_id: int, keywords: Iterable[str], topics: Iterable[str]) -> None:
+        keywords = [k.strip().lower() for k in keywords if k and k.strip()]
+        profile: Profile = (
+            frozenset(keywords),
+            frozenset(t.strip().lower() for t in topics if t and t.strip()),
+        )
+
+        old = self._chat_profile.get(chat_id)
+        if old is not None and old != profile:
+            chats = self._profile_chats[old]
+            chats.discard(chat_id)
+            if not chats:
+                self._drop_profile(old)
+
+        self._chat_profile[chat_id] = profile
+        self._chat_keywords[chat_id] = keywords
+        if profile in self._profile_chats:
+            self._profile_chats[profile].add(chat_id)
+            return
+
+        self._profile_chats[profile] = {chat_id}
+        kws, tps = profile
+        if kws:
+            for kw in kws:
+                self._kw_profiles.setdefault(kw, set()).add(profile)
+        else:
+            self._no_kw_profiles.add(profile)
+        if tps:
+            for t in tps:
+                self._topic_profiles.setdefault(t, set()).add(profile)
+        else:
+            self._no_topic_profiles.add(profile)
+
+    def _drop_profile(self, profile: Profile) -> None:
+        del self._profile_chats[profile]
+        kws, tps = profile
+        for kw in kws:
+            bucket = self._kw_profiles.get(kw)
+            if bucket is not None:
+                bucket.discard(profile)
+                if not bucket:
+                    del self._kw_profiles[kw]
+        for t in tps:
+            bucket = self._topic_profiles.get(t)
+            if bucket is not None:
+                bucket.discard(profile)
+                if not bucket:
+                    del self._topic_profiles[t]
+        self._no_kw_profiles.discard(profile)
+        self._no_topic_profiles.discard(profile)
+
+    # ---------- запити ----------
+    def keywords_of(self, chat_id: int) -> List[str]:
+        with self._lock:
+            return list(self._chat_keywords.get(chat_id, []))
+
+    def profile_of(self, chat_id: int) -> Profile:
+        with self._lock:
+            return self._chat_profile.get(chat_id, (_EMPTY, _EMPTY))
+
+    def _interested_profiles(self, topic_key: str, hits: FrozenSet[str]) -> Set[Profile]:
+        by_topic = self._no_topic_profiles | self._topic_profiles.get(topic_key, set())
+        if not by_topic:
+            return by_topic
+
+        by_kw = set(self._no_kw_profiles)
+        for kw in hits:
+            by_kw |= self._kw_profiles.get(kw, set())
+        return by_topic & by_kw
+
+    def fan_out(
+        self,
+        snapshot: List[Dict],
+        limit_per_feed: int,
+        chat_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[int, List[Dict]]:
+        """
+        Розкладає знімок по чатах. Для кожного чату результат такий самий,
+        як filter_items(snapshot, його ключі, limit_per_feed, теми), але
+        кожна стаття перевіряється один раз, а чати з однаковим профілем
+        отримують спільний список. chat_ids обмежує розкладку цими чатами
+        (партія планувальника), None — усі.
+        """
+        keyword_hits = self.matcher.match_all(snapshot)
+
+        with self._lock:
+            wanted: Optional[Set[int]] = None
+            wanted_profiles: Optional[Set[Profile]] = None
+            if chat_ids is not None:
+                wanted = set(chat_ids)
+                wanted_profiles = {self._chat_profile[c] for c in wanted if c in self._chat_profile}
+
+            group_order: Dict[str, int] = {}
+            per_profile: Dict[Profile, Dict[str, List[Dict]]] = {}
+
+            for item in snapshot:
+                topic_key = item.get("topic_key", "")
+                group_order.setdefault(topic_key, len(group_order))
+                hits = keyword_hits.get(item.get("link", ""), _EMPTY)
+
+                profiles = self._interested_profiles(topic_key, hits)
+                if wanted_profiles is not None:
+                    profiles &= wanted_profiles
+                for profile in profiles:
+                    taken = per_profile.setdefault(profile, {}).setdefault(topic_key, [])
+                    if len(taken) < limit_per_feed:
+                        taken.append(item)
+
+            result: Dict[int, List[Dict]] = {}
+            for profile, groups in per_profile.items():
+                ordered = [groups[k] for k in sorted(groups, key=group_order.__getitem__)]
+                items = assemble_items(ordered)
+                if not items:
+                    continue
+                for chat_id in self._profile_chats[profile]:
+                    if wanted is None or chat_id in wanted:
+                        result[chat_id] = items
+            return result
+
+
+index = SubscriptionIndex()
+storage.on_subscription_changed(index.on_change)
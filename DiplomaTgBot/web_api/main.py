@@ -2,17 +2,31 @@ from __future__ import annotations
 
 import logging
 import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 
 # Твоя реальна функція збору новин
-from news_fetcher import fetch_news  # <-- ОСЬ ВАЖЛИВИЙ РЯДОК
+from news_fetcher import get_sources_health
+from ingestion import get_news_async, search_news_async, start_ingestor
+from config import INGEST_ENABLED, INGEST_IN_API
 
 logger = logging.getLogger("web_api")
 
-app = FastAPI(title="Diploma TgBot API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # статті збирає бот; API лише читає спільну таблицю articles
+    ingestor = start_ingestor() if INGEST_IN_API else None
+    yield
+    if ingestor is not None:
+        ingestor.stop()
+
+
+app = FastAPI(title="Diploma TgBot API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -47,25 +61,48 @@ DEFAULT_TOPICS = [
 ]
 
 @app.get("/health")
-def health():
+async def health():
     return {
         "status": "ok",
         "news_fn_found": True,
-        "news_fn_import": "news_fetcher.fetch_news",
+        "news_fn_import": "ingestion.get_news_async",
     }
 
+@app.get("/sources/health")
+async def sources_health():
+    return {"sources": get_sources_health()}
+
 @app.get("/topics")
-def topics():
+async def topics():
     return {"topics": DEFAULT_TOPICS}
 
+def _parse_date(value: str, end_of_day: bool = False) -> int:
+    # "2026-10-01" або повний ISO -> unix timestamp (UTC); порожньо/помилка -> 0
+    value = (value or "").strip()
+    if not value:
+        return 0
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return 0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    if end_of_day and len(value) == 10:
+        dt += timedelta(days=1, seconds=-1)
+    return int(dt.timestamp())
+
 @app.get("/news")
-def news(
+async def news(
     topic: str = Query(default="all"),
     q: str = Query(default=""),
     limit: int = Query(default=30, ge=1, le=100),
+    date_from: str = Query(default=""),
+    date_to: str = Query(default=""),
 ):
     """
     Повертаємо новини у форматі, зручному для веба.
+    Із q — повнотекстовий пошук по збережених статтях (FTS5, BM25),
+    date_from / date_to (YYYY-MM-DD) обмежують дату публікації.
     """
     keywords = [q] if q.strip() else []
 
@@ -73,13 +110,22 @@ def news(
     if topic and topic != "all":
         selected_topics = [topic]
 
-    # Виклик твоєї функції. Якщо сигнатура інша — скажеш, я піджену.
-    items = fetch_news(
-        keywords=keywords,
-        selected_topics=selected_topics,
-        limit_per_feed=6,
-        ignore_keywords=False,
-    )
+    if q.strip() and INGEST_ENABLED:
+        items = await search_news_async(
+            q,
+            selected_topics=selected_topics,
+            published_from=_parse_date(date_from),
+            published_to=_parse_date(date_to, end_of_day=True),
+            limit=limit,
+        )
+    else:
+        # Виклик твоєї функції. Якщо сигнатура інша — скажеш, я піджену.
+        items = await get_news_async(
+            keywords=keywords,
+            selected_topics=selected_topics,
+            limit_per_feed=6,
+            ignore_keywords=False,
+        )
 
     normalized: List[Dict[str, Any]] = []
     for i, it in enumerate((items or [])[:limit]):